@@ -44,11 +44,7 @@ import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 
 # Import the transcription functions from our module
-from transcribe_videos import (
-    extract_audio_from_video,
-    transcribe_audio_with_word_timestamps,
-    transcribe_audio_with_sentence_timestamps
-)
+from transcribe_videos import transcribe_video_with_timestamps, write_segments
 from content_understanding_client import AzureContentUnderstandingClient
 
 # Setup logging
@@ -116,6 +112,10 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+def work_path(*parts: str) -> Path:
+    """Path under APP_WORK_DIR, which holds inputs/, thumbnails/, static/ and analyzer_templates/ (default: cwd)"""
+    return Path(os.getenv('APP_WORK_DIR', '.'), *parts)
+
 # Processing status storage
 processing_status: Dict[str, Dict[str, Any]] = {}
 
@@ -643,11 +643,10 @@ async def process_video_async(video_path: str, video_name: str):
         merged_segments_path = base + "_merged_segments.json"
         visualization_path = base + "_segments_visualization.png"
         content_json_path = video_path + ".json"
-        audio_path = base + ".wav"
         
         # Step 1: Content Understanding Analysis (always enabled)
         await update_status(video_name, "processing", 10, "Analyzing video content...")
-        analyzer_template_path = "./analyzer_templates/video_content_understanding.json"
+        analyzer_template_path = str(work_path("analyzer_templates", "video_content_understanding.json"))
         loop = asyncio.get_event_loop()
         await loop.run_in_executor(
             executor, 
@@ -658,52 +657,33 @@ async def process_video_async(video_path: str, video_name: str):
             analyzer_template_path
         )
         
-        # Step 2: Extract audio
-        await update_status(video_name, "processing", 30, "Extracting audio from video...")
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(executor, extract_audio_from_video, video_path, audio_path)
-        
-        # Step 3: Word-level transcription
-        await update_status(video_name, "processing", 40, "Transcribing audio (word-level)...")
-        word_segments = await loop.run_in_executor(
+        # Step 2: Transcription (word- and sentence-level from one recognition pass),
+        # with audio streamed from ffmpeg to Azure as it is decoded
+        await update_status(video_name, "processing", 30, "Transcribing audio...")
+        word_segments, sentence_segments = await loop.run_in_executor(
             executor, 
-            transcribe_audio_with_word_timestamps, 
-            audio_path, 
+            transcribe_video_with_timestamps, 
+            video_path, 
             SPEECH_KEY, 
             SPEECH_ENDPOINT
         )
         
-        with open(word_txt_path, "w", encoding="utf-8") as f:
-            for start, end, word in word_segments:
-                f.write(f"[{start:.2f} - {end:.2f}] {word}\n")
-        
-        # Step 4: Sentence-level transcription
-        await update_status(video_name, "processing", 50, "Transcribing audio (sentence-level)...")
-        sentence_segments = await loop.run_in_executor(
-            executor,
-            transcribe_audio_with_sentence_timestamps,
-            audio_path,
-            SPEECH_KEY,
-            SPEECH_ENDPOINT
-        )
+        write_segments(word_txt_path, word_segments)
+        write_segments(sentence_txt_path, sentence_segments)
         
-        with open(sentence_txt_path, "w", encoding="utf-8") as f:
-            for start, end, sentence in sentence_segments:
-                f.write(f"[{start:.2f} - {end:.2f}] {sentence}\n")
-        
-        # Step 5: Extract selling points
+        # Step 3: Extract selling points
         await update_status(video_name, "processing", 70, "Extracting selling points...")
         transcription_text = "\n".join([sentence for _, _, sentence in sentence_segments])
         selling_points = await loop.run_in_executor(executor, extract_selling_points, transcription_text)
         
-        # Step 6: Match selling points with timestamps
+        # Step 4: Match selling points with timestamps
         await update_status(video_name, "processing", 80, "Matching selling points with timestamps...")
         timestamped_selling_points = match_selling_points_with_timestamps(word_segments, selling_points)
         
         with open(selling_points_path, "w", encoding="utf-8") as f:
             json.dump({"selling_points": timestamped_selling_points}, f, indent=2)
         
-        # Step 7: Merge segments (content analysis is always done)
+        # Step 5: Merge segments (content analysis is always done)
         if os.path.exists(content_json_path):
             await update_status(video_name, "processing", 90, "Merging video segments...")
             
@@ -720,10 +700,11 @@ async def process_video_async(video_path: str, video_name: str):
                 min_overlap_percentage=0.2
             )
             
+            # Compact JSON: this file is machine-consumed (visualization, /api/results)
             with open(merged_segments_path, 'w') as f:
-                json.dump(merged_segments, f, indent=2)
+                json.dump(merged_segments, f)
             
-            # Step 8: Generate visualization
+            # Step 6: Generate visualization
             await update_status(video_name, "processing", 95, "Generating visualization...")
             await loop.run_in_executor(
                 executor,
@@ -732,10 +713,6 @@ async def process_video_async(video_path: str, video_name: str):
                 visualization_path
             )
         
-        # Cleanup
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-        
         await update_status(video_name, "completed", 100, "Processing completed successfully!")
         
     except Exception as e:
@@ -1104,7 +1081,7 @@ def parse_arguments():
 
 async def process_all_videos_batch():
     """Process all videos in the inputs directory in batch mode"""
-    input_dir = Path("inputs")
+    input_dir = work_path("inputs")
     videos = list(input_dir.glob("*.mp4"))
     
     if not videos:
@@ -1132,8 +1109,8 @@ async def process_all_videos_batch():
 @app.get("/api/videos")
 async def list_videos() -> list[dict]:          # return plain dicts -> can add extra fields
     """List all mp4 videos in inputs and tell whether results already exist"""
-    input_dir = Path("inputs")
-    thumbnail_dir = Path("thumbnails")
+    input_dir = work_path("inputs")
+    thumbnail_dir = work_path("thumbnails")
     thumbnail_dir.mkdir(exist_ok=True)
 
     videos: list[dict] = []
@@ -1173,7 +1150,7 @@ async def upload_video(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail=f"File type {file_extension} not allowed. Allowed types: {', '.join(allowed_extensions)}")
     
     # Create inputs directory if it doesn't exist
-    input_dir = Path("inputs")
+    input_dir = work_path("inputs")
     input_dir.mkdir(exist_ok=True)
     
     # Generate unique filename if file already exists
@@ -1202,7 +1179,7 @@ async def upload_video(file: UploadFile = File(...)):
         duration = get_video_duration(str(file_path))
         
         # Generate thumbnail
-        thumbnail_dir = Path("thumbnails")
+        thumbnail_dir = work_path("thumbnails")
         thumbnail_dir.mkdir(exist_ok=True)
         thumbnail_path = thumbnail_dir / f"{file_path.stem}.jpg"
         thumbnail_url = None
@@ -1243,7 +1220,7 @@ async def upload_video(file: UploadFile = File(...)):
 @app.post("/api/process")
 async def process_video_endpoint(request: ProcessVideoRequest, background_tasks: BackgroundTasks):
     """Start processing a video"""
-    video_path = os.path.join("inputs", request.video_name)
+    video_path = os.path.join(work_path("inputs"), request.video_name)
     
     if not os.path.exists(video_path):
         raise HTTPException(status_code=404, detail="Video not found")
@@ -1264,7 +1241,7 @@ async def process_batch_endpoint(request: BatchProcessRequest, background_tasks:
     not_found_videos = []
     
     for video_name in request.video_names:
-        video_path = os.path.join("inputs", video_name)
+        video_path = os.path.join(work_path("inputs"), video_name)
         
         if not os.path.exists(video_path):
             not_found_videos.append(video_name)
@@ -1299,7 +1276,7 @@ async def get_all_status():
 @app.get("/api/results/{video_name}")
 async def get_results(video_name: str):
     """Get processing results for a video"""
-    base_path = os.path.join("inputs", os.path.splitext(video_name)[0])
+    base_path = os.path.join(work_path("inputs"), os.path.splitext(video_name)[0])
     
     results = {}
     result_files = {
@@ -1360,7 +1337,7 @@ async def get_results(video_name: str):
 @app.get("/api/visualization/{video_name}")
 async def get_visualization(video_name: str):
     """Get visualization image for a video"""
-    base_path = os.path.join("inputs", os.path.splitext(video_name)[0])
+    base_path = os.path.join(work_path("inputs"), os.path.splitext(video_name)[0])
     viz_path = f"{base_path}_segments_visualization.png"
     
     if os.path.exists(viz_path):
@@ -1372,7 +1349,7 @@ async def get_visualization(video_name: str):
 async def get_thumbnail(video_name: str):
     """Get thumbnail image for a video"""
     # Create thumbnails directory if it doesn't exist
-    thumbnail_dir = Path("thumbnails")
+    thumbnail_dir = work_path("thumbnails")
     thumbnail_dir.mkdir(exist_ok=True)
     
     # Generate thumbnail filename
@@ -1382,7 +1359,7 @@ async def get_thumbnail(video_name: str):
     # Check if thumbnail exists
     if not thumbnail_path.exists():
         # Generate thumbnail
-        video_path = Path("inputs") / video_name
+        video_path = work_path("inputs") / video_name
         if not video_path.exists():
             raise HTTPException(status_code=404, detail="Video not found")
         
@@ -1396,7 +1373,7 @@ async def get_thumbnail(video_name: str):
 @app.delete("/api/videos/{video_name}")
 async def delete_video(video_name: str):
     """Delete a video file and its associated files"""
-    video_path = Path("inputs") / video_name
+    video_path = work_path("inputs") / video_name
     
     if not video_path.exists():
         raise HTTPException(status_code=404, detail="Video not found")
@@ -1427,7 +1404,7 @@ async def delete_video(video_name: str):
             logging.info("Deleted associated files: %s", ", ".join(deleted_files), extra={"files": deleted_files})
         
         # Delete thumbnail from thumbnails directory
-        thumbnail_dir = Path("thumbnails")
+        thumbnail_dir = work_path("thumbnails")
         if thumbnail_dir.exists():
             thumbnail_path = thumbnail_dir / f"{base_path.name}.jpg"
             if thumbnail_path.exists():
@@ -1467,7 +1444,7 @@ async def websocket_endpoint(websocket: WebSocket):
 @app.get("/inputs/{filename}")
 async def serve_video(filename: str):
     """Serve video files from the inputs directory"""
-    video_path = Path("inputs") / filename
+    video_path = work_path("inputs") / filename
     
     if not video_path.exists():
         raise HTTPException(status_code=404, detail="Video file not found")
@@ -1494,7 +1471,7 @@ async def serve_video(filename: str):
     )
 
 # Serve static files (frontend) - MUST BE AFTER all other routes
-app.mount("/", StaticFiles(directory="static", html=True), name="static")
+app.mount("/", StaticFiles(directory=work_path("static"), html=True), name="static")
 
 if __name__ == "__main__":
     args = parse_arguments()
@@ -202,8 +202,6 @@ class AzureContentUnderstandingClient:
         """
         data = None
         if Path(file_location).exists():
-            with open(file_location, "rb") as file:
-                data = file.read()
             headers = {"Content-Type": "application/octet-stream"}
         elif "https://" in file_location or "http://" in file_location:
             data = {"url": file_location}
@@ -221,13 +219,15 @@ class AzureContentUnderstandingClient:
                 json=data,
             )
         else:
-            response = requests.post(
-                url=self._get_analyze_url(
-                    self._endpoint, self._api_version, analyzer_id
-                ),
-                headers=headers,
-                data=data,
-            )
+            # Stream the file from disk rather than reading it into memory first
+            with open(file_location, "rb") as file:
+                response = requests.post(
+                    url=self._get_analyze_url(
+                        self._endpoint, self._api_version, analyzer_id
+                    ),
+                    headers=headers,
+                    data=file,
+                )
 
         response.raise_for_status()
         self._logger.info(
@@ -0,0 +1,103 @@
+"""Shared pytest fixtures for the test suite"""
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from pytest_socket import disable_socket, enable_socket
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from content_understanding_client import AzureContentUnderstandingClient
+
+CU_ENDPOINT = "https://test.endpoint.com"
+CU_API_VERSION = "2024-01-01"
+CU_API_KEY = "test_api_key"
+
+LIVE_SERVER_HOST = "127.0.0.1"
+LIVE_SERVER_BASE_PORT = 8001
+
+# Environment the app module is imported under
+TEST_ENV = {
+    'AZURE_SPEECH_KEY': 'test_key',
+    'AZURE_SPEECH_ENDPOINT': 'https://test.endpoint',
+    'AZURE_OPENAI_API_KEY': 'test_key',
+    'AZURE_OPENAI_API_VERSION': '2024-01-01',
+    'AZURE_OPENAI_ENDPOINT': 'https://test.endpoint',
+    'AZURE_OPENAI_DEPLOYMENT': 'test-deployment',
+    'AZURE_CONTENT_UNDERSTANDING_ENDPOINT': 'https://test.endpoint',
+    'AZURE_CONTENT_UNDERSTANDING_API_VERSION': '2024-01-01',
+    'AZURE_CONTENT_UNDERSTANDING_API_KEY': 'test_key'
+}
+
+
+@pytest.hookimpl(tryfirst=True)  # before xdist reads xdist_group markers
+def pytest_collection_modifyitems(items):
+    """Pin live-server/browser tests to one xdist worker; mocked tests stay ungrouped and spread freely"""
+    for item in items:
+        if 'live_server' in getattr(item, 'fixturenames', ()):
+            item.add_marker(pytest.mark.xdist_group("browser"))
+
+
+def pytest_runtest_setup(item):
+    """Block real network access, except for tests that talk to the live server"""
+    if 'live_server' in getattr(item, 'fixturenames', ()):
+        enable_socket()
+    else:
+        # asyncio event loops (TestClient, asyncio.run) still need their unix socketpair
+        disable_socket(allow_unix_socket=True)
+
+
+@pytest.fixture(scope="class")
+def client():
+    """Content Understanding client shared across tests (immutable after init)"""
+    return AzureContentUnderstandingClient(
+        endpoint=CU_ENDPOINT,
+        api_version=CU_API_VERSION,
+        api_key=CU_API_KEY
+    )
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    """The app module, imported once per session under TEST_ENV"""
+    with patch.dict(os.environ, TEST_ENV):
+        import app
+    return app
+
+
+def _live_server_port():
+    """Port for this process: one per pytest-xdist worker (gw0 -> 8001, gw1 -> 8002, ...)"""
+    worker = os.environ.get('PYTEST_XDIST_WORKER', 'gw0')
+    return LIVE_SERVER_BASE_PORT + int(worker.removeprefix('gw'))
+
+
+@pytest.fixture(scope="session")
+def live_server(app_module):
+    """Uvicorn server started once per test session (per xdist worker); yields its base URL
+
+    The server runs on a background thread of the test process, so the app is
+    imported once and serves from whatever directory the running test chdir'd into.
+    """
+    import uvicorn
+
+    port = _live_server_port()
+    server = uvicorn.Server(uvicorn.Config(
+        app_module.app, host=LIVE_SERVER_HOST, port=port, log_level="error", loop="asyncio"
+    ))
+    server_thread = threading.Thread(target=server.run, daemon=True)
+    server_thread.start()
+
+    # Wait until the server is accepting connections instead of sleeping a fixed time
+    for _ in range(50):
+        if server.started:
+            break
+        time.sleep(0.1)
+
+    yield f"http://{LIVE_SERVER_HOST}:{port}"
+
+    server.should_exit = True
+    server_thread.join(timeout=5)
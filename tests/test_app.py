@@ -266,15 +266,11 @@ class TestFastAPIApp(unittest.TestCase):
         file_content = b"fake video content"
         file = io.BytesIO(file_content)
         
-        # Create directories that the app expects
-        Path("inputs").mkdir(exist_ok=True)
-        Path("thumbnails").mkdir(exist_ok=True)
+        # An existing upload with the same name, so the new one is renamed
+        (self.inputs_dir / "test.mp4").write_bytes(file_content)
         
-        # Create actual test file to avoid filesystem errors
-        test_file_path = Path("inputs/test.mp4")
-        test_file_path.write_bytes(file_content)
-        
-        try:
+        # Upload into the temporary working directory rather than the repository's inputs/
+        with patch.dict(os.environ, {'APP_WORK_DIR': self.temp_dir}):
             with patch('app.get_video_duration', return_value=30.0):
                 with patch('app.generate_thumbnail', return_value=True):
                     with patch('app.manager.broadcast', new_callable=AsyncMock):
@@ -282,15 +278,12 @@ class TestFastAPIApp(unittest.TestCase):
                             "/api/upload",
                             files={"file": ("test.mp4", file, "video/mp4")}
                         )
-            
-            self.assertEqual(response.status_code, 200)
-            data = response.json()
-            self.assertEqual(data["message"], "Video uploaded successfully")
-            self.assertEqual(data["original_filename"], "test.mp4")
-        finally:
-            # Clean up the test file
-            if test_file_path.exists():
-                test_file_path.unlink()
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["message"], "Video uploaded successfully")
+        self.assertEqual(data["original_filename"], "test.mp4")
+        self.assertEqual((self.inputs_dir / "test_1.mp4").read_bytes(), file_content)
     
     def test_upload_video_invalid_type(self):
         """Test video upload with invalid file type"""
@@ -539,30 +532,28 @@ class TestAsyncFunctions(unittest.IsolatedAsyncioTestCase):
             self.assertEqual(broadcast_msg["video_name"], "test.mp4")
     
     @patch('app.analyze_video')
-    @patch('app.extract_audio_from_video')
-    @patch('app.transcribe_audio_with_word_timestamps')
-    @patch('app.transcribe_audio_with_sentence_timestamps')
+    @patch('app.transcribe_video_with_timestamps')
     @patch('app.extract_selling_points')
     @patch('app.match_selling_points_with_timestamps')
     @patch('app.merge_segments_by_selling_points')
     @patch('app.create_segments_visualization')
     @patch('app.generate_thumbnail')
     @patch('os.path.exists')
-    @patch('os.remove')
     @patch('builtins.open', new_callable=mock_open)
     @patch('app.update_status')
     async def test_process_video_async_full_flow(
-        self, mock_update_status, mock_file, mock_remove, mock_exists,
+        self, mock_update_status, mock_file, mock_exists,
         mock_gen_thumb, mock_create_viz, mock_merge, mock_match,
-        mock_extract_sp, mock_transcribe_sent, mock_transcribe_word,
-        mock_extract_audio, mock_analyze
+        mock_extract_sp, mock_transcribe, mock_analyze
     ):
         """Test complete video processing flow"""
         # Setup mocks
         mock_update_status.return_value = AsyncMock()
-        mock_exists.side_effect = [True, True]  # content json exists, audio exists
-        mock_transcribe_word.return_value = [(0, 0.5, "Hello"), (0.5, 1, "World")]
-        mock_transcribe_sent.return_value = [(0, 1, "Hello World")]
+        mock_exists.return_value = True  # content json exists
+        mock_transcribe.return_value = (
+            [(0, 0.5, "Hello"), (0.5, 1, "World")],
+            [(0, 1, "Hello World")]
+        )
         mock_extract_sp.return_value = ["Hello World"]
         mock_match.return_value = [{"startTime": 0, "endTime": 1, "content": "Hello World"}]
         mock_merge.return_value = {"merged_segments": [], "unmerged_segments": [], "final_segments": []}
@@ -577,24 +568,19 @@ class TestAsyncFunctions(unittest.IsolatedAsyncioTestCase):
         
         # Verify all steps were called
         mock_analyze.assert_called_once()
-        mock_extract_audio.assert_called_once()
-        mock_transcribe_word.assert_called_once()
-        mock_transcribe_sent.assert_called_once()
+        mock_transcribe.assert_called_once()
         mock_extract_sp.assert_called_once()
         mock_match.assert_called_once()
         mock_merge.assert_called_once()
         mock_create_viz.assert_called_once()
         mock_gen_thumb.assert_called_once()
-        
-        # Verify cleanup
-        mock_remove.assert_called_once()
     
     @patch('app.update_status')
     async def test_process_video_async_error_handling(self, mock_update_status):
         """Test error handling in video processing"""
         mock_update_status.return_value = AsyncMock()
         
-        with patch('app.extract_audio_from_video', side_effect=Exception("Test error")):
+        with patch('app.transcribe_video_with_timestamps', side_effect=Exception("Test error")):
             await process_video_async("test_video.mp4", "test_video.mp4")
         
         # Verify error status was set
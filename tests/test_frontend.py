@@ -1,9 +1,6 @@
 """Unit tests for frontend JavaScript functionality using Selenium"""
 import os
-import unittest
-import tempfile
 import shutil
-import time
 import json
 from pathlib import Path
 from unittest.mock import patch, MagicMock
@@ -13,227 +10,175 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException
-import multiprocessing
-import uvicorn
+import pytest
+from fastapi.testclient import TestClient
 
 # Add parent directory to path
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
-class TestFrontend(unittest.TestCase):
-    """Test frontend functionality using Selenium"""
+# Decided once at collection so the browser class never starts the live server without Chrome
+CHROME_AVAILABLE = bool(shutil.which("chromedriver") or shutil.which("google-chrome"))
+
+
+def prepare_static(static_dir):
+    """Expose the project frontend as static_dir"""
+    static_source = PROJECT_ROOT / "static"
+    # Tests only read from static/, so link the project frontend instead of copying it
+    try:
+        os.symlink(static_source, static_dir, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        shutil.copytree(static_source, static_dir)
+
+
+@pytest.fixture(scope="session")
+def frontend_dir(tmp_path_factory):
+    """Working directory (inputs/, thumbnails/, static/) generated once per session"""
+    workdir = tmp_path_factory.mktemp("frontend")
+    for name in ("inputs", "thumbnails"):
+        (workdir / name).mkdir()
+    prepare_static(workdir / "static")
+    return workdir
+
+
+@pytest.fixture(scope="session")
+def live_server_dir(frontend_dir):
+    """Serve the live server from the same prepared working directory"""
+    return frontend_dir
+
+
+class TestFrontendAPI:
+    """Test the endpoints the frontend relies on, in-process via TestClient"""
+    
+    @pytest.fixture(scope="class")
+    def api_client(self, app_module):
+        """In-process test client"""
+        return TestClient(app_module.app)
     
-    @classmethod
-    def setUpClass(cls):
-        """Set up test server and browser"""
-        # Set up test environment
-        cls.test_dir = tempfile.mkdtemp()
-        cls.old_cwd = os.getcwd()
-        os.chdir(cls.test_dir)
+    @pytest.fixture(autouse=True)
+    def _workdir(self, api_client, frontend_dir, monkeypatch):
+        """Run each test inside the prepared working directory without spawning ffmpeg/ffprobe"""
+        monkeypatch.chdir(frontend_dir)
+        monkeypatch.setattr('app.get_video_duration', MagicMock(return_value=1.0))
+        monkeypatch.setattr('app.generate_thumbnail', MagicMock(return_value=False))
         
-        # Create required directories
-        Path("inputs").mkdir()
-        Path("thumbnails").mkdir()
-        Path("static").mkdir()
+        # Create a test video file
+        self.test_video = Path("inputs") / "test_video.mp4"
+        self.test_video.write_bytes(b"fake video content")
+        yield
+        # Remove test files
+        for video in Path("inputs").glob("*.mp4"):
+            video.unlink()
+    
+    def test_page_loads(self, api_client):
+        """Test that the dashboard page is served"""
+        response = api_client.get("/")
         
-        # Copy static files (assuming they exist in the project)
-        static_source = Path(cls.old_cwd) / "static"
-        if static_source.exists():
-            shutil.copytree(static_source, Path("static"), dirs_exist_ok=True)
-        else:
-            # Create minimal HTML for testing
-            html_content = '''
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Video Segmentation Dashboard</title>
-            </head>
-            <body>
-                <div id="app">
-                    <h1>Video Segmentation Dashboard</h1>
-                    <div id="videoGrid"></div>
-                    <div id="uploadSection">
-                        <input type="file" id="fileInput" accept="video/*">
-                        <button id="uploadBtn">Upload</button>
-                    </div>
-                    <div id="statusSection"></div>
-                </div>
-                <script>
-                    // Minimal JavaScript for testing
-                    const API_BASE = '';
-                    let ws = null;
-                    
-                    async function loadVideos() {
-                        const response = await fetch(`${API_BASE}/api/videos`);
-                        const videos = await response.json();
-                        const grid = document.getElementById('videoGrid');
-                        grid.innerHTML = videos.map(v => `
-                            <div class="video-card" data-video="${v.name}">
-                                <h3>${v.name}</h3>
-                                <button class="process-btn" data-video="${v.name}">Process</button>
-                                <button class="delete-btn" data-video="${v.name}">Delete</button>
-                            </div>
-                        `).join('');
-                    }
-                    
-                    async function processVideo(videoName) {
-                        const response = await fetch(`${API_BASE}/api/process`, {
-                            method: 'POST',
-                            headers: {'Content-Type': 'application/json'},
-                            body: JSON.stringify({video_name: videoName})
-                        });
-                        return response.json();
-                    }
-                    
-                    function connectWebSocket() {
-                        ws = new WebSocket(`ws://localhost:8001/ws`);
-                        ws.onmessage = (event) => {
-                            const data = JSON.parse(event.data);
-                            if (data.type === 'status_update') {
-                                updateStatus(data.video_name, data.status, data.progress);
-                            }
-                        };
-                    }
-                    
-                    function updateStatus(videoName, status, progress) {
-                        const statusDiv = document.getElementById('statusSection');
-                        statusDiv.innerHTML = `${videoName}: ${status} (${progress}%)`;
-                    }
-                    
-                    // Event listeners
-                    document.addEventListener('click', async (e) => {
-                        if (e.target.classList.contains('process-btn')) {
-                            await processVideo(e.target.dataset.video);
-                        } else if (e.target.classList.contains('delete-btn')) {
-                            await fetch(`${API_BASE}/api/videos/${e.target.dataset.video}`, {
-                                method: 'DELETE'
-                            });
-                            await loadVideos();
-                        }
-                    });
-                    
-                    document.getElementById('uploadBtn')?.addEventListener('click', async () => {
-                        const fileInput = document.getElementById('fileInput');
-                        if (fileInput.files.length > 0) {
-                            const formData = new FormData();
-                            formData.append('file', fileInput.files[0]);
-                            await fetch(`${API_BASE}/api/upload`, {
-                                method: 'POST',
-                                body: formData
-                            });
-                            await loadVideos();
-                        }
-                    });
-                    
-                    // Initialize
-                    loadVideos();
-                    connectWebSocket();
-                </script>
-            </body>
-            </html>
-            '''
-            with open("static/index.html", 'w', encoding='utf-8') as f:
-                f.write(html_content)
+        assert response.status_code == 200
+        assert "Video Segmentation Dashboard" in response.text
+    
+    def test_video_list_display(self, api_client):
+        """Test that the test video is listed"""
+        response = api_client.get("/api/videos")
         
-        # Mock environment variables
-        test_env = {
-            'AZURE_SPEECH_KEY': 'test_key',
-            'AZURE_SPEECH_ENDPOINT': 'https://test.endpoint',
-            'AZURE_OPENAI_API_KEY': 'test_key',
-            'AZURE_OPENAI_API_VERSION': '2024-01-01',
-            'AZURE_OPENAI_ENDPOINT': 'https://test.endpoint',
-            'AZURE_OPENAI_DEPLOYMENT': 'test-deployment',
-            'AZURE_CONTENT_UNDERSTANDING_ENDPOINT': 'https://test.endpoint',
-            'AZURE_CONTENT_UNDERSTANDING_API_VERSION': '2024-01-01',
-            'AZURE_CONTENT_UNDERSTANDING_API_KEY': 'test_key'
-        }
+        assert response.status_code == 200
+        videos = response.json()
+        assert len(videos) == 1
+        assert videos[0]["name"] == "test_video.mp4"
+    
+    def test_video_processing(self, api_client):
+        """Test that processing can be started for a listed video"""
+        with patch('app.process_video_async') as mock_process:
+            response = api_client.post("/api/process", json={"video_name": "test_video.mp4"})
         
-        # Start test server in a separate process
-        def run_server():
-            with patch.dict(os.environ, test_env):
-                from app import app
-                uvicorn.run(app, host="127.0.0.1", port=8001, log_level="error")
+        assert response.status_code == 200
+        assert response.json()["message"] == "Processing started"
+        mock_process.assert_called_once()
+    
+    def test_video_deletion(self, api_client):
+        """Test video deletion"""
+        with patch('app.manager.broadcast'):
+            response = api_client.delete("/api/videos/test_video.mp4")
         
-        cls.server_process = multiprocessing.Process(target=run_server)
-        cls.server_process.start()
-        time.sleep(2)  # Wait for server to start
+        assert response.status_code == 200
+        assert api_client.get("/api/videos").json() == []
+        assert not self.test_video.exists()
+    
+    def test_file_upload(self, api_client):
+        """Test file upload"""
+        with patch('app.manager.broadcast'):
+            response = api_client.post(
+                "/api/upload",
+                files={"file": ("test_upload.mp4", b"upload video content", "video/mp4")}
+            )
         
+        assert response.status_code == 200
+        assert len(api_client.get("/api/videos").json()) == 2  # Original test video + uploaded
+        assert len(list(Path("inputs").glob("test_upload*.mp4"))) > 0
+
+
+@pytest.mark.slow
+@pytest.mark.frontend
+@pytest.mark.skipif(not os.environ.get('RUN_BROWSER_TESTS'), reason="set RUN_BROWSER_TESTS=1 to run Selenium tests")
+@pytest.mark.skipif(not CHROME_AVAILABLE, reason="Chrome WebDriver not available")
+class TestFrontendBrowser:
+    """Test frontend functionality using Selenium against the shared live server"""
+    
+    @pytest.fixture(scope="class")
+    def driver(self):
+        """Headless Chrome driver shared by the class"""
         # Set up Chrome driver with headless option
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--disable-extensions")
+        # Return from navigation at DOMContentLoaded instead of the full load event
+        chrome_options.page_load_strategy = 'eager'
         
-        try:
-            cls.driver = webdriver.Chrome(options=chrome_options)
-            cls.driver.implicitly_wait(10)
-        except Exception:
-            # If Chrome is not available, skip tests
-            cls.driver = None
-    
-    @classmethod
-    def tearDownClass(cls):
-        """Clean up test server and browser"""
-        if hasattr(cls, 'driver') and cls.driver:
-            cls.driver.quit()
-        
-        if hasattr(cls, 'server_process'):
-            cls.server_process.terminate()
-            cls.server_process.join()
-        
-        os.chdir(cls.old_cwd)
-        shutil.rmtree(cls.test_dir, ignore_errors=True)
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.implicitly_wait(10)
+        yield driver
+        driver.quit()
     
-    def setUp(self):
-        """Set up each test"""
-        if not self.driver:
-            self.skipTest("Chrome WebDriver not available")
+    @pytest.fixture(autouse=True)
+    def _server(self, live_server, live_server_dir, driver, monkeypatch):
+        """Run each test inside the live server's working directory"""
+        self.base_url = live_server
+        self.driver = driver
+        monkeypatch.chdir(live_server_dir)
         
         # Create a test video file
         self.test_video = Path("inputs") / "test_video.mp4"
         self.test_video.write_bytes(b"fake video content")
-    
-    def tearDown(self):
-        """Clean up after each test"""
+        
+        # Reuse the already-loaded dashboard instead of navigating for every test
+        if self.driver.current_url.rstrip('/') != self.base_url:
+            self.driver.get(self.base_url)
+        yield
         # Remove test files
         for video in Path("inputs").glob("*.mp4"):
             video.unlink()
     
     def test_page_loads(self):
         """Test that the page loads successfully"""
-        self.driver.get("http://localhost:8001")
-        
         # Check page title
-        self.assertIn("Video Analysis", self.driver.title)
+        assert "Video Analysis" in self.driver.title
         
         # Check main elements exist
         app_div = self.driver.find_element(By.ID, "app")
-        self.assertIsNotNone(app_div)
+        assert app_div is not None
         
         video_grid = self.driver.find_element(By.ID, "videoGrid")
-        self.assertIsNotNone(video_grid)
-    
-    def test_video_list_display(self):
-        """Test that videos are displayed in the grid"""
-        self.driver.get("http://localhost:8001")
-        
-        # Wait for video grid to load
-        WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "video-card"))
-        )
-        
-        # Check that test video is displayed
-        video_cards = self.driver.find_elements(By.CLASS_NAME, "video-card")
-        self.assertEqual(len(video_cards), 1)
-        
-        # Check video name is displayed
-        video_name = video_cards[0].find_element(By.TAG_NAME, "h3").text
-        self.assertEqual(video_name, "test_video.mp4")
+        assert video_grid is not None
     
     def test_video_processing(self):
         """Test video processing functionality"""
-        self.driver.get("http://localhost:8001")
+        # Refresh the grid on the reused page
+        self.driver.execute_script("return loadVideos()")
         
         # Wait for video card to load
         WebDriverWait(self.driver, 10).until(
@@ -246,39 +191,14 @@ class TestFrontend(unittest.TestCase):
             process_btn = self.driver.find_element(By.CLASS_NAME, "process-btn")
             process_btn.click()
             
-            # Wait a bit for the request to be sent
-            time.sleep(1)
-            
-            # Check status section for updates
-            status_section = self.driver.find_element(By.ID, "statusSection")
-            # Status might be updated via WebSocket
-    
-    def test_video_deletion(self):
-        """Test video deletion functionality"""
-        self.driver.get("http://localhost:8001")
-        
-        # Wait for delete button
-        WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "delete-btn"))
-        )
-        
-        # Click delete button
-        delete_btn = self.driver.find_element(By.CLASS_NAME, "delete-btn")
-        delete_btn.click()
-        
-        # Wait for video grid to update
-        time.sleep(1)
-        
-        # Check that video is removed from grid
-        video_cards = self.driver.find_elements(By.CLASS_NAME, "video-card")
-        self.assertEqual(len(video_cards), 0)
-        
-        # Check that file is deleted
-        self.assertFalse(self.test_video.exists())
+            # Wait for the status update pushed over the WebSocket
+            WebDriverWait(self.driver, 5).until(
+                lambda d: "test_video.mp4" in d.find_element(By.ID, "statusSection").text
+            )
     
     def test_file_upload(self):
         """Test file upload functionality"""
-        self.driver.get("http://localhost:8001")
+        self.driver.get(self.base_url)
         
         # Create a temporary file to upload
         upload_file = Path("test_upload.mp4")
@@ -295,16 +215,14 @@ class TestFrontend(unittest.TestCase):
             # Click upload button
             upload_btn.click()
             
-            # Wait for upload to complete and grid to update
-            time.sleep(2)
-            
-            # Check that new video appears in grid
-            video_cards = self.driver.find_elements(By.CLASS_NAME, "video-card")
-            self.assertEqual(len(video_cards), 2)  # Original test video + uploaded
+            # Wait for upload to complete and the new video to appear in the grid
+            WebDriverWait(self.driver, 5).until(
+                lambda d: len(d.find_elements(By.CLASS_NAME, "video-card")) == 2  # Original test video + uploaded
+            )
             
             # Check uploaded file exists in inputs directory
             uploaded_files = list(Path("inputs").glob("test_upload*.mp4"))
-            self.assertTrue(len(uploaded_files) > 0)
+            assert len(uploaded_files) > 0
             
         finally:
             # Clean up
@@ -312,20 +230,16 @@ class TestFrontend(unittest.TestCase):
     
     def test_websocket_connection(self):
         """Test WebSocket connection and status updates"""
-        self.driver.get("http://localhost:8001")
-        
         # Execute JavaScript to check WebSocket state
         ws_state = self.driver.execute_script("return ws ? ws.readyState : -1")
         
         # WebSocket states: 0=CONNECTING, 1=OPEN, 2=CLOSING, 3=CLOSED
-        self.assertIn(ws_state, [0, 1])  # Should be connecting or open
-        
-        # Wait a bit for connection to establish
-        time.sleep(1)
+        assert ws_state in [0, 1]  # Should be connecting or open
         
-        # Check again
-        ws_state = self.driver.execute_script("return ws ? ws.readyState : -1")
-        self.assertEqual(ws_state, 1)  # Should be open
+        # Wait for connection to establish (should be open)
+        WebDriverWait(self.driver, 5).until(
+            lambda d: d.execute_script("return ws && ws.readyState") == 1
+        )
     
     def test_responsive_design(self):
         """Test that the page is responsive"""
@@ -338,15 +252,12 @@ class TestFrontend(unittest.TestCase):
         
         for width, height in viewports:
             self.driver.set_window_size(width, height)
-            self.driver.get("http://localhost:8001")
+            self.driver.get(self.base_url)
             
             # Check that main elements are visible
             app_div = self.driver.find_element(By.ID, "app")
-            self.assertTrue(app_div.is_displayed())
+            assert app_div.is_displayed()
             
             video_grid = self.driver.find_element(By.ID, "videoGrid")
-            self.assertTrue(video_grid.is_displayed())
-
+            assert video_grid.is_displayed()
 
-if __name__ == '__main__':
-    unittest.main()
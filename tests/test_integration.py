@@ -1,13 +1,21 @@
 """Integration tests for the video analysis pipeline"""
+import contextlib
 import os
 import unittest
 from unittest.mock import patch, MagicMock
-import tempfile
-import shutil
 from pathlib import Path
 import json
-import asyncio
 import io
+import asyncio
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any
+import azure.cognitiveservices.speech as speechsdk
+import httpx
+import matplotlib
+import orjson
+from fastapi.testclient import TestClient
+from pyfakefs import fake_filesystem_unittest
 
 # Add parent directory to path for imports
 import sys
@@ -26,137 +34,139 @@ test_env = {
     'AZURE_CONTENT_UNDERSTANDING_API_KEY': 'test_cu_key'
 }
 
+# Import the app on the real filesystem, before any test activates pyfakefs
+with patch.dict(os.environ, test_env):
+    import app as app_module
+    from app import process_video_async, update_status
+
+
+TEST_DIR = "/tmp/test"
+
+# Batch sizes exercised by the batch processing test
+BATCH_SIZES = (3, 10, 100)
+
+# Fixture payloads, serialized once at import
+_FAKE_VIDEO = b"fake video content"
+
+_CONTENT_RESULT_BYTES = orjson.dumps({
+    "result": {
+        "contents": [{
+            "startTimeMs": 1000,
+            "endTimeMs": 3000,
+            "fields": {
+                "sellingPoint": {"valueString": "Magical pockets"},
+                "description": {"valueString": "Showing pocket feature"}
+            }
+        }]
+    }
+})
+
+_ANALYZER_TEMPLATE_BYTES = orjson.dumps({
+    "name": "test_analyzer",
+    "description": "Test analyzer"
+})
+
+_PIPELINE_WORDS = [
+    {'Offset': 10000000, 'Duration': 5000000, 'Word': 'Magical'},
+    {'Offset': 15000000, 'Duration': 5000000, 'Word': 'pockets'}
+]
+_SENTENCE_EVENT_JSON = json.dumps({'NBest': [{'Lexical': 'Magical pockets', 'Words': _PIPELINE_WORDS}]})
+
+
+@dataclass
+class FakeRecoResult:
+    """Recognition result carrying only what the transcribe callbacks read"""
+    reason: Any
+    json: str
 
-class TestIntegration(unittest.TestCase):
+
+@dataclass
+class FakeRecoEvent:
+    """Recognized event passed to the transcribe callbacks"""
+    result: FakeRecoResult
+
+
+class FakeRecognizer:
+    """SpeechRecognizer stub that emits its event and stops as soon as recognition starts"""
+    
+    def __init__(self, event):
+        self._event = event
+        self._callbacks = []
+        self._stopped_callbacks = []
+        self.recognized = SimpleNamespace(connect=self._callbacks.append)
+        self.session_stopped = SimpleNamespace(connect=self._stopped_callbacks.append)
+        self.canceled = SimpleNamespace(connect=lambda callback: None)
+    
+    def start_continuous_recognition(self):
+        for callback in self._callbacks:
+            callback(self._event)
+        for callback in self._stopped_callbacks:
+            callback(None)
+    
+    def stop_continuous_recognition(self):
+        pass
+
+
+class TestIntegration(fake_filesystem_unittest.TestCaseMixin, unittest.IsolatedAsyncioTestCase):
     """Integration tests for complete pipeline flow"""
     
+    @classmethod
+    def setUpClass(cls):
+        """Register the patches every test shares once for the whole class"""
+        super().setUpClass()
+        stack = contextlib.ExitStack()
+        stack.enter_context(patch.dict(os.environ, test_env))
+        stack.enter_context(patch('matplotlib.pyplot.savefig'))
+        cls.addClassCleanup(stack.close)
+    
     def setUp(self):
-        """Set up test environment"""
-        self.test_dir = tempfile.mkdtemp()
+        """Set up test environment on an in-memory filesystem"""
+        self.setUpPyfakefs()
+        # The visualization step needs matplotlib's real font files
+        self.fs.add_real_directory(matplotlib.get_data_path())
+        self.test_dir = TEST_DIR
         self.inputs_dir = Path(self.test_dir) / "inputs"
-        self.inputs_dir.mkdir()
+        self.inputs_dir.mkdir(parents=True)
         
         # Create a fake video file
         self.test_video = self.inputs_dir / "test_video.mp4"
-        self.test_video.write_bytes(b"fake video content")
+        self.test_video.write_bytes(_FAKE_VIDEO)
     
-    def tearDown(self):
-        """Clean up test environment"""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-    
-    @patch.dict(os.environ, test_env)
+    @patch.object(app_module.manager, 'broadcast')
     @patch('app.analyze_video')
     @patch('subprocess.run')
+    @patch('subprocess.Popen')
     @patch('azure.cognitiveservices.speech.SpeechRecognizer')
     @patch('openai.AzureOpenAI')
-    @patch('matplotlib.pyplot.savefig')
-    def test_full_pipeline_flow(self, mock_savefig, mock_openai_class, 
-                               mock_recognizer_class, mock_subprocess, 
-                               mock_analyze):
+    async def test_full_pipeline_flow(self, mock_openai_class, mock_recognizer_class,
+                               mock_popen, mock_subprocess, mock_analyze, mock_broadcast):
         """Test complete pipeline from video to final results"""
-        from app import process_video_async
-        
         # Mock content understanding analysis
         mock_analyze.return_value = self.test_video.parent / f"{self.test_video.name}.json"
-        content_result = {
-            "result": {
-                "contents": [{
-                    "startTimeMs": 1000,
-                    "endTimeMs": 3000,
-                    "fields": {
-                        "sellingPoint": {"valueString": "Magical pockets"},
-                        "description": {"valueString": "Showing pocket feature"}
-                    }
-                }]
-            }
-        }
-        with open(mock_analyze.return_value, 'w', encoding='utf-8') as f:
-            json.dump(content_result, f)
+        mock_analyze.return_value.write_bytes(_CONTENT_RESULT_BYTES)
         
-        # Mock ffmpeg for audio extraction and thumbnail
+        # Mock ffmpeg for the streamed audio and the thumbnail
+        mock_popen.return_value = MagicMock(stdout=io.BytesIO(b"\x00\x00" * 16000), returncode=0)
         mock_subprocess.return_value = MagicMock(returncode=0)
         
-        # Mock speech recognition
-        mock_recognizer = MagicMock()
-        mock_recognizer_class.return_value = mock_recognizer
-        
-        # Mock word recognition
-        word_event = MagicMock()
-        word_event.result.reason = MagicMock(RecognizedSpeech=1)
-        word_event.result.json = json.dumps({
-            'NBest': [{
-                'Words': [
-                    {'Offset': 10000000, 'Duration': 5000000, 'Word': 'Magical'},
-                    {'Offset': 15000000, 'Duration': 5000000, 'Word': 'pockets'}
-                ]
-            }]
-        })
-        
-        # Mock sentence recognition
-        sentence_event = MagicMock()
-        sentence_event.result.reason = MagicMock(RecognizedSpeech=1)
-        sentence_event.result.json = json.dumps({
-            'NBest': [{
-                'Lexical': 'Magical pockets',
-                'Words': [
-                    {'Offset': 10000000, 'Duration': 5000000, 'Word': 'Magical'},
-                    {'Offset': 15000000, 'Duration': 5000000, 'Word': 'pockets'}
-                ]
-            }]
-        })
-        
-        # Setup recognition callbacks - simpler approach
-        call_count = 0
-        def side_effect(*args, **kwargs):
-            nonlocal call_count
-            recognizer = MagicMock()
-            
-            # Choose event based on call count
-            current_event = word_event if call_count == 0 else sentence_event
-            
-            # Set up the recognition simulation
-            recognized_callback = None
-            
-            def connect_recognized(callback):
-                nonlocal recognized_callback
-                recognized_callback = callback
-            
-            def start_recognition():
-                # Immediately trigger recognition
-                if recognized_callback:
-                    recognized_callback(current_event)
-                # Set done to stop the while loop
-                recognizer.done = True
-            
-            recognizer.recognized.connect = connect_recognized
-            recognizer.session_stopped.connect = MagicMock()
-            recognizer.canceled.connect = MagicMock()
-            recognizer.start_continuous_recognition = start_recognition
-            recognizer.stop_continuous_recognition = MagicMock()
-            recognizer.done = False  # Initial state
-            
-            call_count += 1
-            return recognizer
-        
-        mock_recognizer_class.side_effect = side_effect
+        # The single recognition pass emits one recognized event carrying both words and sentence
+        event = FakeRecoEvent(FakeRecoResult(speechsdk.ResultReason.RecognizedSpeech, _SENTENCE_EVENT_JSON))
+        mock_recognizer_class.side_effect = lambda *args, **kwargs: FakeRecognizer(event)
         
         # Mock OpenAI selling points extraction
         mock_openai = MagicMock()
         mock_openai_class.return_value = mock_openai
         
-        mock_response = MagicMock()
-        mock_response.choices = [MagicMock()]
-        mock_response.choices[0].message.content = json.dumps({
-            "selling_points": ["Magical pockets"]
-        })
-        mock_openai.chat.completions.create.return_value = mock_response
-        
-        # Mock visualization creation
-        mock_savefig.return_value = None
+        mock_openai.chat.completions.create.return_value = SimpleNamespace(choices=[
+            SimpleNamespace(message=SimpleNamespace(content=json.dumps({"selling_points": ["Magical pockets"]})))
+        ])
         
         # Run the pipeline
-        with patch('os.chdir', return_value=None):
-            asyncio.run(process_video_async(str(self.test_video), "test_video.mp4"))
+        await process_video_async(str(self.test_video), "test_video.mp4")
+        
+        # The run must have reached the end rather than stopping at an error status
+        last_status = mock_broadcast.await_args.args[0]
+        self.assertEqual(last_status["status"], "completed", last_status["message"])
         
         # Verify outputs were created
         base_path = self.test_video.with_suffix('')
@@ -177,40 +187,36 @@ class TestIntegration(unittest.TestCase):
         # Check selling points file
         sp_file = Path(f"{base_path}_selling_points.json")
         self.assertTrue(sp_file.exists())
-        sp_data = json.loads(sp_file.read_text(encoding='utf-8'))
+        sp_data = orjson.loads(sp_file.read_bytes())
         self.assertEqual(len(sp_data["selling_points"]), 1)
         self.assertEqual(sp_data["selling_points"][0]["content"], "Magical pockets")
         
         # Check merged segments file
         merged_file = Path(f"{base_path}_merged_segments.json")
         self.assertTrue(merged_file.exists())
-        merged_data = json.loads(merged_file.read_text(encoding='utf-8'))
+        merged_data = orjson.loads(merged_file.read_bytes())
         self.assertIn("merged_segments", merged_data)
         self.assertIn("unmerged_segments", merged_data)
         self.assertIn("final_segments", merged_data)
     
-    @patch.dict(os.environ, test_env)
     def test_pipeline_with_missing_azure_credentials(self):
         """Test pipeline behavior with missing Azure credentials"""
+        from transcribe_videos import _validate_env
+        
         # Remove required environment variables
         with patch.dict(os.environ, {'AZURE_SPEECH_KEY': '', 'AZURE_SPEECH_ENDPOINT': ''}):
-            # Importing should fail
+            # Credential validation should fail
             with self.assertRaises(SystemExit):
-                import importlib
-                import transcribe_videos
-                importlib.reload(transcribe_videos)
+                _validate_env()
     
-    @patch.dict(os.environ, test_env)
-    @patch('subprocess.run')
-    def test_pipeline_with_ffmpeg_failure(self, mock_subprocess):
+    @patch('subprocess.Popen')
+    async def test_pipeline_with_ffmpeg_failure(self, mock_subprocess):
         """Test pipeline handling of ffmpeg failures"""
-        from app import process_video_async
-        
         # Mock ffmpeg failure
         mock_subprocess.side_effect = Exception("FFmpeg not found")
         
         # Run the pipeline - should handle error gracefully
-        asyncio.run(process_video_async(str(self.test_video), "test_video.mp4"))
+        await process_video_async(str(self.test_video), "test_video.mp4")
         
         # Check that no output files were created (except maybe error status)
         base_path = self.test_video.with_suffix('')
@@ -218,65 +224,60 @@ class TestIntegration(unittest.TestCase):
         self.assertFalse(Path(f"{base_path}_sentence.txt").exists())
 
 
-class TestEndToEndAPI(unittest.TestCase):
+class TestEndToEndAPI(fake_filesystem_unittest.TestCaseMixin, unittest.IsolatedAsyncioTestCase):
     """End-to-end tests for the API"""
     
     def setUp(self):
-        """Set up test environment"""
-        from fastapi.testclient import TestClient
+        """Set up test environment on an in-memory filesystem"""
+        # Start every test from an empty status registry, with the app rooted at TEST_DIR
+        for patcher in (patch.dict(app_module.processing_status, clear=True),
+                        patch.dict(os.environ, {'APP_WORK_DIR': TEST_DIR})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
         
-        self.test_dir = tempfile.mkdtemp()
-        self.old_cwd = os.getcwd()
-        os.chdir(self.test_dir)
+        self.setUpPyfakefs()
+        self.work_dir = Path(TEST_DIR)
         
         # Create required directories
-        Path("inputs").mkdir()
-        Path("thumbnails").mkdir()
-        Path("static").mkdir()
+        for name in ("inputs", "thumbnails", "static", "analyzer_templates"):
+            (self.work_dir / name).mkdir(parents=True)
         
         # Create analyzer template
-        Path("analyzer_templates").mkdir()
-        template = {
-            "name": "test_analyzer",
-            "description": "Test analyzer"
-        }
-        with open("analyzer_templates/video_content_understanding.json", 'w', encoding='utf-8') as f:
-            json.dump(template, f)
-        
-        with patch.dict(os.environ, test_env):
-            from app import app
-            self.client = TestClient(app)
+        (self.work_dir / "analyzer_templates" / "video_content_understanding.json").write_bytes(_ANALYZER_TEMPLATE_BYTES)
     
-    def tearDown(self):
-        """Clean up test environment"""
-        os.chdir(self.old_cwd)
-        shutil.rmtree(self.test_dir, ignore_errors=True)
+    async def asyncSetUp(self):
+        """Call the REST endpoints in-process over ASGI, without TestClient's portal thread"""
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app_module.app), base_url="http://testserver")
+        self.addAsyncCleanup(self.client.aclose)
     
-    def test_video_upload_process_results_flow(self):
+    async def test_video_upload_process_results_flow(self):
         """Test complete flow: upload -> process -> get results"""
         # Step 1: Upload video
-        video_content = b"fake video content"
-        response = self.client.post(
+        response = await self.client.post(
             "/api/upload",
-            files={"file": ("test.mp4", io.BytesIO(video_content), "video/mp4")}
+            files={"file": ("test.mp4", io.BytesIO(_FAKE_VIDEO), "video/mp4")}
         )
         self.assertEqual(response.status_code, 200)
         video_name = response.json()["video"]["name"]
         
+        # Steps 2 and 3 are independent reads, issued concurrently
+        list_response, status_response = await asyncio.gather(
+            self.client.get("/api/videos"),
+            self.client.get(f"/api/status/{video_name}")
+        )
+        
         # Step 2: List videos - should include uploaded video
-        response = self.client.get("/api/videos")
-        self.assertEqual(response.status_code, 200)
-        videos = response.json()
+        self.assertEqual(list_response.status_code, 200)
+        videos = list_response.json()
         self.assertTrue(any(v["name"] == video_name for v in videos))
         
         # Step 3: Get initial status - should be not_started
-        response = self.client.get(f"/api/status/{video_name}")
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json()["status"], "not_started")
+        self.assertEqual(status_response.status_code, 200)
+        self.assertEqual(status_response.json()["status"], "not_started")
         
         # Step 4: Start processing
         with patch('app.process_video_async') as mock_process:
-            response = self.client.post(
+            response = await self.client.post(
                 "/api/process",
                 json={"video_name": video_name}
             )
@@ -284,47 +285,46 @@ class TestEndToEndAPI(unittest.TestCase):
             mock_process.assert_called_once()
         
         # Step 5: Delete video
-        response = self.client.delete(f"/api/videos/{video_name}")
+        response = await self.client.delete(f"/api/videos/{video_name}")
         self.assertEqual(response.status_code, 200)
         
         # Step 6: Verify video is deleted
-        response = self.client.get("/api/videos")
+        response = await self.client.get("/api/videos")
         videos = response.json()
         self.assertFalse(any(v["name"] == video_name for v in videos))
     
-    def test_batch_processing_flow(self):
-        """Test batch processing of multiple videos"""
-        # Create multiple test videos
-        video_names = []
-        for i in range(3):
-            video_path = Path("inputs") / f"test_video_{i}.mp4"
-            video_path.write_bytes(b"fake video content")
-            video_names.append(video_path.name)
-        
-        # Process batch
-        with patch('app.process_video_async') as mock_process:
-            response = self.client.post(
-                "/api/process-batch",
-                json={
-                    "video_names": video_names + ["nonexistent.mp4"],
-                    "enable_content_understanding": True
-                }
-            )
-            self.assertEqual(response.status_code, 200)
-            data = response.json()
-            self.assertEqual(len(data["processed_videos"]), 3)
-            self.assertEqual(len(data["not_found_videos"]), 1)
-            self.assertEqual(mock_process.call_count, 3)
+    async def test_batch_processing_flow(self):
+        """Test batch processing of multiple videos, at increasing batch sizes"""
+        for count in BATCH_SIZES:
+            with self.subTest(count=count):
+                # Write one video and hard-link the rest to it
+                video_paths = [self.work_dir / "inputs" / f"batch{count}_video_{i}.mp4" for i in range(count)]
+                video_paths[0].write_bytes(_FAKE_VIDEO)
+                for video_path in video_paths[1:]:
+                    os.link(video_paths[0], video_path)
+                video_names = [video_path.name for video_path in video_paths]
+                
+                # Process batch
+                with patch('app.process_video_async') as mock_process:
+                    response = await self.client.post(
+                        "/api/process-batch",
+                        json={
+                            "video_names": video_names + ["nonexistent.mp4"],
+                            "enable_content_understanding": True
+                        }
+                    )
+                    self.assertEqual(response.status_code, 200)
+                    data = response.json()
+                    self.assertEqual(len(data["processed_videos"]), count)
+                    self.assertEqual(len(data["not_found_videos"]), 1)
+                    self.assertEqual(mock_process.call_count, count)
     
-    async def test_websocket_status_updates(self):
+    def test_websocket_status_updates(self):
         """Test WebSocket status updates"""
-        from fastapi.testclient import TestClient
-        from app import app, update_status
-        
-        with TestClient(app) as client:
+        with TestClient(app_module.app) as client:
             with client.websocket_connect("/ws") as websocket:
-                # Update status
-                await update_status("test.mp4", "processing", 50, "Processing...")
+                # Update status on the app's own event loop, which owns the socket
+                client.portal.call(update_status, "test.mp4", "processing", 50, "Processing...")
                 
                 # Should receive update via WebSocket
                 data = websocket.receive_json()
@@ -1,199 +1,252 @@
 """Unit tests for transcribe_videos.py module"""
+import contextlib
+import io
 import os
+import shutil
+import subprocess
 import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, MagicMock, call
 from pathlib import Path
+from types import SimpleNamespace
 import json
+import azure.cognitiveservices.speech as speechsdk
 
 # Add parent directory to path for imports
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from transcribe_videos import (
-    extract_audio_from_video,
-    transcribe_audio_with_word_timestamps,
-    transcribe_audio_with_sentence_timestamps,
+    transcribe_video_with_timestamps,
+    probe_duration,
+    detect_silences,
+    plan_shards,
+    RecognizerPool,
+    get_recognizer_pool,
+    get_whisper_model,
+    default_workers,
+    MAX_SPEECH_SESSIONS,
     main
 )
 
+# Recognizer event payloads, serialized once at import
+_WORD_EVENT_JSON = json.dumps({
+    'NBest': [{
+        'Words': [
+            {'Offset': 10000000, 'Duration': 5000000, 'Word': 'Hello'},
+            {'Offset': 20000000, 'Duration': 5000000, 'Word': 'World'}
+        ]
+    }]
+})
+_SENTENCE_EVENT_JSON = json.dumps({
+    'NBest': [{
+        'Lexical': 'hello world how are you',
+        'Words': [
+            {'Offset': 10000000, 'Duration': 5000000, 'Word': 'hello'},
+            {'Offset': 20000000, 'Duration': 5000000, 'Word': 'world'},
+            {'Offset': 30000000, 'Duration': 5000000, 'Word': 'how'},
+            {'Offset': 40000000, 'Duration': 5000000, 'Word': 'are'},
+            {'Offset': 50000000, 'Duration': 5000000, 'Word': 'you'}
+        ]
+    }]
+})
+
 
 class TestTranscribeVideos(unittest.TestCase):
     """Test cases for video transcription functions"""
     
+    @classmethod
+    def setUpClass(cls):
+        """Patch the Speech SDK entry points once for the whole class"""
+        stack = contextlib.ExitStack()
+        stack.enter_context(patch.object(speechsdk, 'SpeechConfig'))
+        stack.enter_context(patch.object(speechsdk, 'AudioConfig'))
+        cls.mock_recognizer_class = stack.enter_context(patch.object(speechsdk, 'SpeechRecognizer'))
+        cls.addClassCleanup(stack.close)
+        
+        # Worker thread reused by the transcription tests
+        cls.executor = ThreadPoolExecutor(max_workers=1)
+        cls.addClassCleanup(cls.executor.shutdown, wait=False)
+    
     def setUp(self):
         """Set up test fixtures"""
         self.test_video_path = "test_video.mp4"
-        self.test_audio_path = "test_audio.wav"
         self.test_speech_key = "test_key"
         self.test_speech_endpoint = "https://test.endpoint.com"
     
+    def tearDown(self):
+        """Forget the recognizer configured by the previous test"""
+        self.mock_recognizer_class.reset_mock(return_value=True)
+    
     @patch('subprocess.run')
-    def test_extract_audio_from_video_success(self, mock_run):
-        """Test successful audio extraction from video"""
-        mock_run.return_value = MagicMock(returncode=0)
-        
-        # Should not raise exception
-        extract_audio_from_video(self.test_video_path, self.test_audio_path)
-        
-        # Verify ffmpeg command
-        expected_cmd = [
-            "ffmpeg", "-y", "-i", self.test_video_path, "-vn", 
-            "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1", 
-            self.test_audio_path
-        ]
-        mock_run.assert_called_once()
-        actual_cmd = mock_run.call_args[0][0]
-        self.assertEqual(actual_cmd, expected_cmd)
+    def test_probe_duration(self, mock_run):
+        """Test reading a video's duration with ffprobe"""
+        mock_run.return_value = MagicMock(stdout="12.345\n")
+        
+        self.assertEqual(probe_duration(self.test_video_path), 12.345)
+        self.assertEqual(mock_run.call_args[0][0][0], "ffprobe")
+    
+    @patch('subprocess.run', side_effect=FileNotFoundError("ffprobe"))
+    def test_probe_duration_failure(self, mock_run):
+        """Test that an unreadable duration is reported as None"""
+        self.assertIsNone(probe_duration(self.test_video_path))
     
     @patch('subprocess.run')
-    def test_extract_audio_from_video_failure(self, mock_run):
-        """Test audio extraction failure handling"""
-        mock_run.side_effect = Exception("FFmpeg error")
-        
-        with self.assertRaises(Exception) as context:
-            extract_audio_from_video(self.test_video_path, self.test_audio_path)
-        
-        self.assertIn("FFmpeg error", str(context.exception))
-    
-    @patch('azure.cognitiveservices.speech.ResultReason')
-    @patch('azure.cognitiveservices.speech.SpeechRecognizer')
-    @patch('azure.cognitiveservices.speech.AudioConfig')
-    @patch('azure.cognitiveservices.speech.SpeechConfig')
-    def test_transcribe_audio_with_word_timestamps(self, mock_speech_config, 
-                                                   mock_audio_config, 
-                                                   mock_recognizer_class,
-                                                   mock_result_reason):
+    def test_detect_silences(self, mock_run):
+        """Test parsing silence boundaries from ffmpeg's silencedetect output"""
+        mock_run.return_value = MagicMock(stderr=(
+            "[silencedetect @ 0x1] silence_start: -0.01\n"
+            "[silencedetect @ 0x1] silence_end: 1.5 | silence_duration: 1.51\n"
+            "[silencedetect @ 0x1] silence_start: 298\n"
+            "[silencedetect @ 0x1] silence_end: 299 | silence_duration: 1\n"
+        ))
+        
+        self.assertEqual(detect_silences(self.test_video_path), [(0.0, 1.5), (298.0, 299.0)])
+    
+    def test_plan_shards_cuts_at_silences(self):
+        """Test that shards are cut in the silence nearest each boundary"""
+        silences = [(290.0, 292.0), (640.0, 650.0)]
+        
+        shards = plan_shards(1000.0, silences, shard_seconds=300)
+        
+        # 291 is nearest 300, then 645 is nearest 591; the 355s left stay in the last shard
+        self.assertEqual(shards, [(0.0, 291.0), (291.0, 645.0), (645.0, None)])
+    
+    def test_plan_shards_without_silences(self):
+        """Test that shards are cut at fixed boundaries when no silence is nearby"""
+        self.assertEqual(
+            plan_shards(1000.0, [], shard_seconds=300),
+            [(0.0, 300.0), (300.0, 600.0), (600.0, None)]
+        )
+    
+    def test_plan_shards_short_recording(self):
+        """Test that a recording shorter than one and a half shards is not split"""
+        self.assertEqual(plan_shards(400.0, [(200.0, 201.0)], shard_seconds=300), [(0.0, None)])
+    
+    @patch('transcribe_videos._transcribe_stream')
+    @patch('transcribe_videos.detect_silences', return_value=[])
+    def test_transcribe_long_video_in_shards(self, mock_silences, mock_stream):
+        """Test that long videos are transcribed per shard with absolute timestamps"""
+        mock_stream.side_effect = lambda video_path, pool, start, end: (
+            [(1.0, 1.5, f"word@{start:.0f}")], [(1.0, 2.0, f"sentence@{start:.0f}")]
+        )
+        
+        words, sentences = transcribe_video_with_timestamps(
+            self.test_video_path, self.test_speech_key, self.test_speech_endpoint,
+            pool=MagicMock(), duration=700.0
+        )
+        
+        self.assertEqual(mock_stream.call_count, 2)
+        self.assertEqual(words, [(1.0, 1.5, "word@0"), (301.0, 301.5, "word@300")])
+        self.assertEqual(sentences, [(1.0, 2.0, "sentence@0"), (301.0, 302.0, "sentence@300")])
+    
+    @patch('subprocess.Popen')
+    def test_transcribe_video_word_timestamps(self, mock_popen):
         """Test word-level transcription"""
+        mock_popen.return_value.stdout = io.BytesIO(b'\x00\x00' * 16000)
+        mock_popen.return_value.returncode = 0
+        
         # Mock the recognizer
         mock_recognizer = MagicMock()
-        mock_recognizer_class.return_value = mock_recognizer
-        
-        # Mock the ResultReason enum
-        mock_result_reason.RecognizedSpeech = 1
+        self.mock_recognizer_class.return_value = mock_recognizer
         
         # Mock recognition result
         mock_event = MagicMock()
-        mock_event.result.reason = 1  # Use the same value as RecognizedSpeech
-        mock_event.result.json = json.dumps({
-            'NBest': [{
-                'Words': [
-                    {'Offset': 10000000, 'Duration': 5000000, 'Word': 'Hello'},
-                    {'Offset': 20000000, 'Duration': 5000000, 'Word': 'World'}
-                ]
-            }]
-        })
-        
-        # Simulate recognition callback
+        mock_event.result.reason = speechsdk.ResultReason.RecognizedSpeech
+        mock_event.result.json = _WORD_EVENT_JSON
+        
+        # Simulate recognition callbacks
         recognized_callback = None
+        stopped_callback = None
+        callback_registered = threading.Event()
         def capture_callback(callback):
             nonlocal recognized_callback
             recognized_callback = callback
+        def capture_stopped(callback):
+            nonlocal stopped_callback
+            stopped_callback = callback
+            callback_registered.set()
         
         mock_recognizer.recognized.connect = capture_callback
-        mock_recognizer.session_stopped.connect = MagicMock()
+        mock_recognizer.session_stopped.connect = capture_stopped
         mock_recognizer.canceled.connect = MagicMock()
         
-        # Start the function in a thread to test async behavior
-        import threading
-        results = []
-        def run_transcribe():
-            nonlocal results
-            results = transcribe_audio_with_word_timestamps(
-                self.test_audio_path, 
-                self.test_speech_key, 
-                self.test_speech_endpoint
-            )
-        
-        thread = threading.Thread(target=run_transcribe)
-        thread.start()
+        # Run the function on the shared worker thread to test async behavior
+        future = self.executor.submit(
+            transcribe_video_with_timestamps,
+            self.test_video_path,
+            self.test_speech_key,
+            self.test_speech_endpoint
+        )
         
-        # Give time for setup
-        import time
-        time.sleep(0.1)
+        # Wait until the recognizer callback has been registered
+        self.assertTrue(callback_registered.wait(timeout=1.0))
         
         # Simulate recognition event
-        if recognized_callback:
-            recognized_callback(mock_event)
+        recognized_callback(mock_event)
         
         # Signal completion
-        mock_recognizer.done = True
+        stopped_callback(MagicMock())
         
-        thread.join(timeout=2)
+        results = future.result(timeout=2)[0]
         
         # Verify results
         self.assertEqual(len(results), 2)
         self.assertEqual(results[0], (1.0, 1.5, 'Hello'))
         self.assertEqual(results[1], (2.0, 2.5, 'World'))
     
-    @patch('azure.cognitiveservices.speech.ResultReason')
-    @patch('azure.cognitiveservices.speech.SpeechRecognizer')
-    @patch('azure.cognitiveservices.speech.AudioConfig')
-    @patch('azure.cognitiveservices.speech.SpeechConfig')
-    def test_transcribe_audio_with_sentence_timestamps(self, mock_speech_config, 
-                                                       mock_audio_config, 
-                                                       mock_recognizer_class,
-                                                       mock_result_reason):
+    @patch('subprocess.Popen')
+    def test_transcribe_video_sentence_timestamps(self, mock_popen):
         """Test sentence-level transcription"""
+        mock_popen.return_value.stdout = io.BytesIO(b'\x00\x00' * 16000)
+        mock_popen.return_value.returncode = 0
+        
         # Mock the recognizer
         mock_recognizer = MagicMock()
-        mock_recognizer_class.return_value = mock_recognizer
-        
-        # Mock the ResultReason enum
-        mock_result_reason.RecognizedSpeech = 1
+        self.mock_recognizer_class.return_value = mock_recognizer
         
         # Mock recognition result
         mock_event = MagicMock()
-        mock_event.result.reason = 1  # Use the same value as RecognizedSpeech
-        mock_event.result.json = json.dumps({
-            'NBest': [{
-                'Lexical': 'hello world how are you',
-                'Words': [
-                    {'Offset': 10000000, 'Duration': 5000000, 'Word': 'hello'},
-                    {'Offset': 20000000, 'Duration': 5000000, 'Word': 'world'},
-                    {'Offset': 30000000, 'Duration': 5000000, 'Word': 'how'},
-                    {'Offset': 40000000, 'Duration': 5000000, 'Word': 'are'},
-                    {'Offset': 50000000, 'Duration': 5000000, 'Word': 'you'}
-                ]
-            }]
-        })
-        
-        # Simulate recognition callback
+        mock_event.result.reason = speechsdk.ResultReason.RecognizedSpeech
+        mock_event.result.json = _SENTENCE_EVENT_JSON
+        
+        # Simulate recognition callbacks
         recognized_callback = None
+        stopped_callback = None
+        callback_registered = threading.Event()
         def capture_callback(callback):
             nonlocal recognized_callback
             recognized_callback = callback
+        def capture_stopped(callback):
+            nonlocal stopped_callback
+            stopped_callback = callback
+            callback_registered.set()
         
         mock_recognizer.recognized.connect = capture_callback
-        mock_recognizer.session_stopped.connect = MagicMock()
+        mock_recognizer.session_stopped.connect = capture_stopped
         mock_recognizer.canceled.connect = MagicMock()
         
-        # Start the function in a thread
-        import threading
-        results = []
-        def run_transcribe():
-            nonlocal results
-            results = transcribe_audio_with_sentence_timestamps(
-                self.test_audio_path, 
-                self.test_speech_key, 
-                self.test_speech_endpoint
-            )
-        
-        thread = threading.Thread(target=run_transcribe)
-        thread.start()
+        # Run the function on the shared worker thread to test async behavior
+        future = self.executor.submit(
+            transcribe_video_with_timestamps,
+            self.test_video_path,
+            self.test_speech_key,
+            self.test_speech_endpoint
+        )
         
-        # Give time for setup
-        import time
-        time.sleep(0.1)
+        # Wait until the recognizer callback has been registered
+        self.assertTrue(callback_registered.wait(timeout=1.0))
         
         # Simulate recognition event
-        if recognized_callback:
-            recognized_callback(mock_event)
+        recognized_callback(mock_event)
         
         # Signal completion
-        mock_recognizer.done = True
+        stopped_callback(MagicMock())
         
-        thread.join(timeout=2)
+        results = future.result(timeout=2)[1]
         
         # Verify results
         self.assertEqual(len(results), 1)
@@ -201,67 +254,358 @@ class TestTranscribeVideos(unittest.TestCase):
         self.assertEqual(results[0][1], 5.5)  # end time
         self.assertEqual(results[0][2], 'hello world how are you')
     
-    @patch('transcribe_videos.transcribe_audio_with_sentence_timestamps')
-    @patch('transcribe_videos.transcribe_audio_with_word_timestamps')
-    @patch('transcribe_videos.extract_audio_from_video')
-    @patch('glob.glob')
-    @patch('os.path.exists')
-    @patch('os.remove')
-    @patch('builtins.open', create=True)
-    @patch.dict(os.environ, {
-        'AZURE_SPEECH_KEY': 'test_key',
-        'AZURE_SPEECH_ENDPOINT': 'https://test.endpoint.com'
-    })
-    def test_main_function(self, mock_open, mock_remove, mock_exists, 
-                          mock_glob, mock_extract, mock_word_transcribe, 
-                          mock_sentence_transcribe):
+    def test_recognizer_pool_shares_speech_config(self):
+        """Test that recognizers acquired from one pool share a single SpeechConfig"""
+        with patch.object(speechsdk, 'SpeechConfig') as mock_config_class:
+            pool = RecognizerPool(self.test_speech_key, self.test_speech_endpoint)
+            for audio_config in ("first.wav", "second.wav"):
+                with pool.acquire(audio_config):
+                    pass
+        
+        mock_config_class.assert_called_once_with(
+            subscription=self.test_speech_key, endpoint=self.test_speech_endpoint
+        )
+        self.mock_recognizer_class.assert_has_calls([
+            call(speech_config=pool.speech_config, audio_config="first.wav"),
+            call(speech_config=pool.speech_config, audio_config="second.wav"),
+        ])
+    
+    @patch('subprocess.Popen')
+    def test_transcribe_video_streams_ffmpeg_output(self, mock_popen):
+        """Test that ffmpeg's PCM output is pushed to the recognizer without a temporary file"""
+        pcm = b'\x01\x00' * 40000
+        mock_popen.return_value.stdout = io.BytesIO(pcm)
+        mock_popen.return_value.returncode = 0
+        
+        pushed = []
+        mock_recognizer = MagicMock()
+        self.mock_recognizer_class.return_value = mock_recognizer
+        mock_event = MagicMock()
+        mock_event.result.reason = speechsdk.ResultReason.RecognizedSpeech
+        mock_event.result.json = _SENTENCE_EVENT_JSON
+        
+        # Recognition emits one phrase and stops
+        def start_recognition():
+            mock_recognizer.recognized.connect.call_args[0][0](mock_event)
+            mock_recognizer.session_stopped.connect.call_args[0][0](MagicMock())
+        mock_recognizer.start_continuous_recognition.side_effect = start_recognition
+        
+        with patch.object(speechsdk.audio, 'PushAudioInputStream') as mock_push_class:
+            mock_push_class.return_value.write.side_effect = pushed.append
+            words, sentences = transcribe_video_with_timestamps(
+                self.test_video_path, self.test_speech_key, self.test_speech_endpoint
+            )
+        
+        cmd = mock_popen.call_args[0][0]
+        self.assertEqual(cmd[-1], "pipe:1")
+        self.assertEqual(b''.join(pushed), pcm)
+        mock_push_class.return_value.close.assert_called_once()
+        self.assertEqual(len(words), 5)
+        self.assertEqual(sentences, [(1.0, 5.5, 'hello world how are you')])
+    
+    def test_get_recognizer_pool_is_shared_across_threads(self):
+        """Test that threads racing on the first lookup share one pool and one SpeechConfig"""
+        def slow_config(**kwargs):
+            time.sleep(0.05)
+            return MagicMock()
+        
+        with patch.object(speechsdk, 'SpeechConfig', side_effect=slow_config) as mock_config_class:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                pools = list(executor.map(
+                    lambda _: get_recognizer_pool("racing_key", self.test_speech_endpoint), range(4)
+                ))
+        
+        self.assertTrue(all(pool is pools[0] for pool in pools))
+        mock_config_class.assert_called_once()
+    
+    def test_get_recognizer_pool_defaults_share_one_pool(self):
+        """Test that omitting word_level and passing its default reach the same pool"""
+        self.assertIs(
+            get_recognizer_pool("defaults_key", self.test_speech_endpoint),
+            get_recognizer_pool("defaults_key", self.test_speech_endpoint, word_level=True)
+        )
+    
+    def test_recognizer_pool_prewarm_opens_connection(self):
+        """Test that pre-warming opens and closes one connection without a session slot"""
+        pool = RecognizerPool(self.test_speech_key, self.test_speech_endpoint, max_sessions=1)
+        
+        with patch.object(speechsdk, 'Connection') as mock_connection_class:
+            with pool.acquire("busy.wav"):
+                pool.prewarm()
+        
+        connection = mock_connection_class.from_recognizer.return_value
+        connection.open.assert_called_once_with(True)
+        connection.close.assert_called_once()
+    
+    @patch('subprocess.Popen')
+    def test_recognizer_pool_sentence_level_uses_simple_format(self, mock_popen):
+        """Test that a sentence-only pool requests the Simple format and reads phrase timings"""
+        pool = RecognizerPool(self.test_speech_key, self.test_speech_endpoint, word_level=False)
+        self.assertEqual(pool.speech_config.output_format, speechsdk.OutputFormat.Simple)
+        
+        mock_recognizer = MagicMock()
+        self.mock_recognizer_class.return_value = mock_recognizer
+        mock_event = MagicMock()
+        mock_event.result.reason = speechsdk.ResultReason.RecognizedSpeech
+        mock_event.result.offset = 10000000
+        mock_event.result.duration = 25000000
+        mock_event.result.text = "Hello world."
+        def start_recognition():
+            mock_recognizer.recognized.connect.call_args[0][0](mock_event)
+            mock_recognizer.session_stopped.connect.call_args[0][0](MagicMock())
+        mock_recognizer.start_continuous_recognition.side_effect = start_recognition
+        
+        mock_popen.return_value.stdout = io.BytesIO(b'\x00\x00' * 16000)
+        mock_popen.return_value.returncode = 0
+        
+        words, sentences = transcribe_video_with_timestamps(
+            self.test_video_path, self.test_speech_key, self.test_speech_endpoint, pool=pool
+        )
+        
+        self.assertEqual(words, [])
+        self.assertEqual(sentences, [(1.0, 3.5, "Hello world.")])
+    
+    @patch('subprocess.Popen')
+    def test_transcribe_short_clip_single_shot(self, mock_popen):
+        """Test that short clips are recognized utterance by utterance without a continuous session"""
+        mock_popen.return_value.stdout = io.BytesIO(b'\x00\x00' * 16000)
+        mock_popen.return_value.returncode = 0
+        mock_recognizer = MagicMock()
+        self.mock_recognizer_class.return_value = mock_recognizer
+        
+        recognized = MagicMock(reason=speechsdk.ResultReason.RecognizedSpeech, json=_WORD_EVENT_JSON)
+        no_match = MagicMock(reason=speechsdk.ResultReason.NoMatch)
+        end_of_stream = MagicMock(reason=speechsdk.ResultReason.Canceled)
+        end_of_stream.cancellation_details.reason = speechsdk.CancellationReason.EndOfStream
+        mock_recognizer.recognize_once_async.return_value.get.side_effect = [recognized, no_match, end_of_stream]
+        
+        words, sentences = transcribe_video_with_timestamps(
+            self.test_video_path, self.test_speech_key, self.test_speech_endpoint, duration=5.0
+        )
+        
+        mock_recognizer.start_continuous_recognition.assert_not_called()
+        self.assertEqual(mock_recognizer.recognize_once_async.call_count, 3)
+        self.assertEqual(words, [(1.0, 1.5, 'Hello'), (2.0, 2.5, 'World')])
+        self.assertEqual(sentences, [(1.0, 2.5, '')])
+    
+    @patch('subprocess.Popen')
+    def test_transcribe_video_ffmpeg_failure(self, mock_popen):
+        """Test that an ffmpeg failure is raised rather than returning an empty transcript"""
+        mock_popen.return_value.stdout = io.BytesIO(b'')
+        mock_popen.return_value.returncode = 1
+        mock_recognizer = MagicMock()
+        self.mock_recognizer_class.return_value = mock_recognizer
+        mock_recognizer.start_continuous_recognition.side_effect = (
+            lambda: mock_recognizer.canceled.connect.call_args[0][0](MagicMock())
+        )
+        
+        with self.assertRaises(subprocess.CalledProcessError):
+            transcribe_video_with_timestamps(
+                self.test_video_path, self.test_speech_key, self.test_speech_endpoint
+            )
+    
+    @patch('subprocess.Popen')
+    def test_transcribe_short_clip_canceled_with_error(self, mock_popen):
+        """Test that a single-shot cancellation other than the end of the audio is raised"""
+        mock_popen.return_value.stdout = io.BytesIO(b'\x00\x00' * 16000)
+        mock_popen.return_value.returncode = 0
+        mock_recognizer = MagicMock()
+        self.mock_recognizer_class.return_value = mock_recognizer
+        canceled = MagicMock(reason=speechsdk.ResultReason.Canceled)
+        canceled.cancellation_details.reason = speechsdk.CancellationReason.Error
+        canceled.cancellation_details.error_details = "Quota exceeded"
+        mock_recognizer.recognize_once_async.return_value.get.return_value = canceled
+        
+        with self.assertRaisesRegex(RuntimeError, "Quota exceeded"):
+            transcribe_video_with_timestamps(
+                self.test_video_path, self.test_speech_key, self.test_speech_endpoint, duration=5.0
+            )
+    
+    @patch('transcribe_videos.probe_duration', return_value=60.0)
+    @patch('subprocess.Popen')
+    def test_main_does_not_cache_canceled_session(self, mock_popen, mock_probe):
+        """Test that a session canceled with an error writes and caches nothing, so a re-run retries"""
+        mock_popen.return_value.returncode = 0
+        mock_recognizer = MagicMock()
+        self.mock_recognizer_class.return_value = mock_recognizer
+        error = MagicMock()
+        error.cancellation_details.reason = speechsdk.CancellationReason.Error
+        error.cancellation_details.error_details = "Authentication failed"
+        mock_recognizer.start_continuous_recognition.side_effect = (
+            lambda: mock_recognizer.canceled.connect.call_args[0][0](error)
+        )
+        input_dir = self._make_input_dir("a.mp4")
+        
+        for _ in range(2):
+            mock_popen.return_value.stdout = io.BytesIO(b'\x00\x00' * 16000)
+            main(input_dir=input_dir)
+        
+        self.assertEqual(mock_recognizer.start_continuous_recognition.call_count, 2)
+        self.assertFalse(os.path.exists(os.path.join(input_dir, "a_word.txt")))
+    
+    def _make_input_dir(self, *names):
+        """Create a temporary inputs directory holding small fake videos"""
+        input_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, input_dir)
+        for name in names:
+            Path(input_dir, name).write_bytes(b"fake video content")
+        return input_dir
+    
+    @patch('transcribe_videos.transcribe_video_with_timestamps')
+    def test_main_function(self, mock_transcribe):
         """Test main function flow"""
         # Setup mocks
-        mock_glob.return_value = ["inputs/test_video.mp4"]
-        mock_exists.return_value = True
-        mock_extract.return_value = None
-        mock_word_transcribe.return_value = [
-            (0.0, 0.5, "Hello"),
-            (0.6, 1.0, "World")
-        ]
-        mock_sentence_transcribe.return_value = [
-            (0.0, 1.0, "Hello World")
-        ]
+        mock_transcribe.return_value = (
+            [(0.0, 0.5, "Hello"), (0.6, 1.0, "World")],
+            [(0.0, 1.0, "Hello World")]
+        )
+        input_dir = self._make_input_dir("test_video.mp4")
+        video_path = os.path.join(input_dir, "test_video.mp4")
         
-        # Mock file operations
-        mock_file = MagicMock()
-        mock_open.return_value.__enter__.return_value = mock_file
+        # Run main on an explicit video list instead of scanning inputs/
+        main(videos=[video_path], input_dir=input_dir)
         
-        # Run main
-        main()
-        
-        # Verify calls
-        mock_glob.assert_called_once_with(os.path.join("inputs", "*.mp4"))
-        mock_extract.assert_called_once()
-        mock_word_transcribe.assert_called_once()
-        mock_sentence_transcribe.assert_called_once()
+        # Verify a single recognition pass streamed from the video
+        mock_transcribe.assert_called_once()
+        self.assertEqual(mock_transcribe.call_args[0][0], video_path)
         
         # Verify file writes
-        self.assertEqual(mock_file.write.call_count, 3)  # 2 words + 1 sentence
-        
-        # Verify cleanup
-        mock_remove.assert_called_once()
-    
-    @patch('glob.glob')
-    @patch('builtins.open', create=True)
-    @patch.dict(os.environ, {
-        'AZURE_SPEECH_KEY': 'test_key',
-        'AZURE_SPEECH_ENDPOINT': 'https://test.endpoint.com'
-    })
-    def test_main_no_videos(self, mock_open, mock_glob):
+        self.assertEqual(
+            Path(input_dir, "test_video_word.txt").read_text(encoding="utf-8"),
+            "[0.00 - 0.50] Hello\n[0.60 - 1.00] World\n"
+        )
+        self.assertEqual(
+            Path(input_dir, "test_video_sentence.txt").read_text(encoding="utf-8"),
+            "[0.00 - 1.00] Hello World\n"
+        )
+    
+    @patch('transcribe_videos.transcribe_video_with_timestamps')
+    def test_main_multiple_videos_concurrently(self, mock_transcribe):
+        """Test that main processes every video when running several workers"""
+        mock_transcribe.return_value = ([(0.0, 0.5, "Hello")], [(0.0, 0.5, "Hello")])
+        names = [f"video_{i}.mp4" for i in range(5)]
+        input_dir = self._make_input_dir(*names)
+        videos = [os.path.join(input_dir, name) for name in names]
+        
+        main(videos=videos, workers=3, input_dir=input_dir)
+        
+        transcribed = sorted(args[0] for args, _ in mock_transcribe.call_args_list)
+        self.assertEqual(transcribed, videos)
+    
+    @patch('transcribe_videos.transcribe_video_with_timestamps')
+    def test_main_explicit_videos_without_inputs_dir(self, mock_transcribe):
+        """Test that explicitly given videos keep their cache next to them, not in a missing inputs/"""
+        mock_transcribe.return_value = ([(0.0, 0.5, "Hello")], [(0.0, 0.5, "Hello")])
+        video_dir = self._make_input_dir("clip.mp4")
+        video_path = os.path.join(video_dir, "clip.mp4")
+        
+        # Run from a directory without inputs/
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self._make_input_dir())
+        main(videos=[video_path])
+        
+        self.assertTrue(os.path.exists(os.path.join(video_dir, "clip_word.txt")))
+        with open(os.path.join(video_dir, ".transcribe_cache.json"), encoding="utf-8") as f:
+            self.assertIn(video_path, json.load(f))
+    
+    @patch('transcribe_videos.transcribe_video_with_timestamps')
+    def test_main_skips_up_to_date_videos(self, mock_transcribe):
+        """Test that a re-run only transcribes videos whose outputs are missing or stale"""
+        mock_transcribe.return_value = ([(0.0, 0.5, "Hello")], [(0.0, 0.5, "Hello")])
+        input_dir = self._make_input_dir("same.mp4", "changed.mp4")
+        
+        main(input_dir=input_dir)
+        self.assertEqual(mock_transcribe.call_count, 2)
+        
+        # Only the modified video is transcribed again
+        Path(input_dir, "changed.mp4").write_bytes(b"new video content")
+        mock_transcribe.reset_mock()
+        main(input_dir=input_dir)
+        mock_transcribe.assert_called_once()
+        self.assertEqual(mock_transcribe.call_args[0][0], os.path.join(input_dir, "changed.mp4"))
+        
+        # force re-transcribes everything
+        mock_transcribe.reset_mock()
+        main(input_dir=input_dir, force=True)
+        self.assertEqual(mock_transcribe.call_count, 2)
+    
+    @patch('transcribe_videos.transcribe_video_with_timestamps')
+    def test_main_reruns_on_granularity_change(self, mock_transcribe):
+        """Test that outputs saved at another granularity are not reused"""
+        mock_transcribe.return_value = ([(0.0, 0.5, "Hello")], [(0.0, 0.5, "Hello")])
+        input_dir = self._make_input_dir("clip.mp4")
+        
+        main(input_dir=input_dir)
+        main(input_dir=input_dir, granularity="sentence")
+        
+        self.assertEqual(mock_transcribe.call_count, 2)
+        self.assertEqual(mock_transcribe.call_args.kwargs["granularity"], "sentence")
+    
+    @patch('transcribe_videos.transcribe_video_with_timestamps')
+    def test_main_sentence_granularity(self, mock_transcribe):
+        """Test that sentence granularity only produces the sentence file"""
+        mock_transcribe.return_value = ([], [(0.0, 1.0, "Hello world.")])
+        input_dir = self._make_input_dir("test_video.mp4")
+        
+        main(input_dir=input_dir, granularity="sentence")
+        
+        self.assertEqual(mock_transcribe.call_args[1]["granularity"], "sentence")
+        self.assertFalse(Path(input_dir, "test_video_word.txt").exists())
+        self.assertEqual(
+            Path(input_dir, "test_video_sentence.txt").read_text(encoding="utf-8"),
+            "[0.00 - 1.00] Hello world.\n"
+        )
+    
+    @patch('transcribe_videos.transcribe_video_with_timestamps')
+    @patch('transcribe_videos.get_whisper_model')
+    def test_main_whisper_backend(self, mock_get_model, mock_azure_transcribe):
+        """Test that the whisper backend transcribes locally, in the same segment format"""
+        words = [SimpleNamespace(start=0.0, end=0.4, word=" Hello"), SimpleNamespace(start=0.5, end=0.9, word=" world.")]
+        mock_get_model.return_value.transcribe.return_value = (
+            iter([SimpleNamespace(start=0.0, end=0.9, text=" Hello world.", words=words)]), None
+        )
+        input_dir = self._make_input_dir("test_video.mp4")
+        
+        main(input_dir=input_dir, backend="whisper")
+        
+        mock_azure_transcribe.assert_not_called()
+        self.assertEqual(mock_get_model.return_value.transcribe.call_args[1], {"word_timestamps": True})
+        self.assertEqual(
+            Path(input_dir, "test_video_word.txt").read_text(encoding="utf-8"),
+            "[0.00 - 0.40] Hello\n[0.50 - 0.90] world.\n"
+        )
+        self.assertEqual(
+            Path(input_dir, "test_video_sentence.txt").read_text(encoding="utf-8"),
+            "[0.00 - 0.90] Hello world.\n"
+        )
+    
+    @patch('transcribe_videos.os.cpu_count', return_value=8)
+    def test_whisper_model_splits_cpu_threads_between_workers(self, mock_cpu_count):
+        """Test that the whisper workers together use one thread per core"""
+        fake_module = SimpleNamespace(WhisperModel=MagicMock())
+        with patch.dict(sys.modules, {"faster_whisper": fake_module}):
+            get_whisper_model.__wrapped__()
+        
+        kwargs = fake_module.WhisperModel.call_args.kwargs
+        self.assertEqual(kwargs["num_workers"] * kwargs["cpu_threads"], 8)
+    
+    @patch('transcribe_videos.os.cpu_count', return_value=1)
+    def test_default_workers_by_backend(self, mock_cpu_count):
+        """Test that Azure fills every speech session even on one core, while whisper follows the CPU count"""
+        self.assertEqual(default_workers("azure"), MAX_SPEECH_SESSIONS)
+        self.assertEqual(default_workers("whisper"), 1)
+    
+    @patch('transcribe_videos.transcribe_video_with_timestamps')
+    def test_main_no_videos(self, mock_transcribe):
         """Test main function when no videos are found"""
-        mock_glob.return_value = []
+        input_dir = self._make_input_dir("notes.txt")
         
         # Should complete without errors
-        main()
+        main(input_dir=input_dir)
         
-        # Verify no file operations occurred
-        mock_open.assert_not_called()
+        # Verify nothing was transcribed or written
+        mock_transcribe.assert_not_called()
+        self.assertEqual(os.listdir(input_dir), ["notes.txt"])
 
 
 if __name__ == '__main__':
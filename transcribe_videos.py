@@ -1,168 +1,580 @@
 """
 transcribe_videos.py
 
-Transcribes all .mp4 videos in the 'inputs' directory using Azure Speech-to-Text (STT) service.
+Transcribes all .mp4 videos in the 'inputs' directory using Azure Speech-to-Text (STT) service,
+or locally with faster-whisper (--backend whisper).
 Saves transcriptions as .txt files in the same directory.
 
 - Uses .env file for Azure credentials (endpoint and key)
-- Extracts audio from video using ffmpeg
+- Streams audio from video into the recognizer using ffmpeg
 - Handles errors and logs progress
 - Easy to understand and extend
 
 References:
 - Azure Speech SDK: https://learn.microsoft.com/en-us/azure/ai-services/speech-service/quickstarts/setup-platform?tabs=linux%2Cmacos%2Cwindows&pivots=programming-language-python
 - ffmpeg: https://ffmpeg.org/
+- faster-whisper: https://github.com/SYSTRAN/faster-whisper
 """
 import os
-import glob
 import logging
+import argparse
+import functools
+import hashlib
+import inspect
+import json
+import re
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import azure.cognitiveservices.speech as speechsdk
 
+try:
+    # Faster parser for the recognizer's per-phrase result JSON; the stdlib parser works too
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
 # Load Azure credentials from .env
 load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+
+def _validate_env():
+    """Return (speech_key, speech_endpoint) from the environment, exiting if either is missing"""
+    speech_key = os.getenv('AZURE_SPEECH_KEY')
+    speech_endpoint = os.getenv('AZURE_SPEECH_ENDPOINT')
+    if not speech_key or not speech_endpoint:
+        logging.error("Azure Speech credentials not set in .env file.")
+        exit(1)
+    return speech_key, speech_endpoint
+
+# Read at import; the command line insists on them only for the Azure backend
 SPEECH_KEY = os.getenv('AZURE_SPEECH_KEY')
 SPEECH_ENDPOINT = os.getenv('AZURE_SPEECH_ENDPOINT')
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+# Upper bound on concurrent Azure Speech sessions per process
+MAX_SPEECH_SESSIONS = 4
+
+# Raw PCM format ffmpeg streams to the recognizer: 16 kHz, 16-bit, mono
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_BITS_PER_SAMPLE = 16
+AUDIO_CHANNELS = 1
+
+# Bytes read from the ffmpeg pipe per push to the recognizer
+PIPE_CHUNK_SIZE = 32768
+
+# Videos longer than this are split at silences and their shards transcribed in parallel,
+# keeping each Azure session short
+SHARD_THRESHOLD_SECONDS = 600
+# Target length of each shard
+SHARD_SECONDS = 300
+# Clips shorter than this (the longest single utterance recognize_once handles) skip the continuous session
+SINGLE_SHOT_MAX_SECONDS = 15.0
+
+# faster-whisper model used by the local backend
+WHISPER_MODEL_SIZE = "small"
+
+# Transcription files produced for each --granularity
+GRANULARITIES = {"word": ("word",), "sentence": ("sentence",), "both": ("word", "sentence")}
+OUTPUT_SUFFIXES = {"word": "_word.txt", "sentence": "_sentence.txt"}
 
-if not SPEECH_KEY or not SPEECH_ENDPOINT:
-    logging.error("Azure Speech credentials not set in .env file.")
-    exit(1)
+# Records, per video, the fingerprint its transcription files were produced from
+CACHE_FILENAME = ".transcribe_cache.json"
+# Bytes hashed from the start of each video for its fingerprint
+FINGERPRINT_BYTES = 1 << 20
 
-def extract_audio_from_video(video_path, audio_path):
+class RecognizerPool:
+    """
+    Shares one configured SpeechConfig across recognitions and caps how many Azure
+    sessions run at once. A SpeechRecognizer is bound to its audio input when it is
+    created, so acquire() builds one per audio file from the shared config.
+
+    Word timings need the Detailed (NBest) output format; when only sentences are
+    wanted (word_level=False) the much smaller Simple format is requested instead.
+    """
+    def __init__(self, speech_key, speech_endpoint, max_sessions=MAX_SPEECH_SESSIONS, word_level=True):
+        self.speech_config = speechsdk.SpeechConfig(subscription=speech_key, endpoint=speech_endpoint)
+        self.word_level = word_level
+        if word_level:
+            self.speech_config.output_format = speechsdk.OutputFormat.Detailed
+            self.speech_config.request_word_level_timestamps()
+        else:
+            self.speech_config.output_format = speechsdk.OutputFormat.Simple
+        self._sessions = threading.BoundedSemaphore(max_sessions)
+
+    def prewarm(self):
+        """
+        Opens and closes one connection to the service so that the first real recognition does not
+        also pay for loading the SDK's native connection stack, DNS and TLS setup.
+        """
+        audio_config = speechsdk.AudioConfig(stream=speechsdk.audio.PushAudioInputStream())
+        recognizer = speechsdk.SpeechRecognizer(speech_config=self.speech_config, audio_config=audio_config)
+        connection = speechsdk.Connection.from_recognizer(recognizer)
+        connection.open(True)
+        connection.close()
+
+    @contextmanager
+    def acquire(self, audio_config):
+        """Yields a recognizer for `audio_config`, waiting while max_sessions are in use"""
+        with self._sessions:
+            yield speechsdk.SpeechRecognizer(speech_config=self.speech_config, audio_config=audio_config)
+
+def _cached(func):
+    """
+    functools.lru_cache for process-wide singletons, plus a lock so that threads racing on the
+    first call wait for one instance instead of each building their own. Arguments are bound to
+    the signature first, so f(a) and f(a, default) share one instance.
+    """
+    cached = functools.lru_cache(maxsize=None)(func)
+    signature = inspect.signature(func)
+    lock = threading.Lock()
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        with lock:
+            return cached(*bound.args)
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+@_cached
+def get_recognizer_pool(speech_key, speech_endpoint, word_level=True):
+    """Process-wide RecognizerPool for the given credentials and output detail"""
+    return RecognizerPool(speech_key, speech_endpoint, word_level=word_level)
+
+def probe_duration(video_path):
+    """
+    Returns the duration of a video in seconds using ffprobe, or None if it cannot be read.
     """
-    Extracts audio from video using ffmpeg command line tool.
+    cmd = [
+        "ffprobe", "-v", "error", "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1", video_path
+    ]
+    try:
+        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+        return float(result.stdout.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError) as e:
+        logging.warning(f"Could not read duration of {video_path}: {e}")
+        return None
+
+def stream_audio_from_video(video_path, start=None, end=None):
+    """
+    Starts ffmpeg decoding the audio of a video (optionally only [start, end) seconds) to raw PCM
+    on its stdout and returns the process.
     Requires ffmpeg to be installed and available in PATH.
     """
-    import subprocess
+    # -ss before -i: seek the input; -t: stop after the shard's length
+    seek = ["-ss", str(start)] if start else []
+    limit = ["-t", str(end - (start or 0))] if end is not None else []
+    # -vn: no video, -f s16le: headerless PCM, pipe:1: write to stdout
+    cmd = [
+        "ffmpeg", *seek, "-i", video_path, *limit, "-vn", "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ar", str(AUDIO_SAMPLE_RATE), "-ac", str(AUDIO_CHANNELS), "pipe:1"
+    ]
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+_SILENCE_RE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+
+def detect_silences(video_path, noise_db=-40, min_silence=0.5):
+    """
+    Returns the (start, end) seconds of each silent stretch in a video's audio,
+    using ffmpeg's silencedetect filter.
+    """
+    cmd = [
+        "ffmpeg", "-i", video_path, "-vn",
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}", "-f", "null", "-"
+    ]
+    # silencedetect reports on stderr
+    result = subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    silences = []
+    silence_start = None
+    for kind, value in _SILENCE_RE.findall(result.stderr):
+        if kind == "start":
+            silence_start = max(float(value), 0.0)
+        elif silence_start is not None:
+            silences.append((silence_start, float(value)))
+            silence_start = None
+    return silences
+
+def plan_shards(duration, silences, shard_seconds=SHARD_SECONDS):
+    """
+    Splits a `duration`-second recording into (start, end) shards of about `shard_seconds`,
+    cutting in the middle of the silence nearest each boundary (or at the boundary itself when
+    no silence is within half a shard). The last shard's end is None: it runs to the end of input.
+    """
+    midpoints = [(silence_start + silence_end) / 2 for silence_start, silence_end in silences]
+    cuts = []
+    target = shard_seconds
+    while target < duration - shard_seconds / 2:
+        candidates = [m for m in midpoints if abs(m - target) <= shard_seconds / 2]
+        cut = min(candidates, key=lambda m: abs(m - target)) if candidates else target
+        cuts.append(cut)
+        target = cut + shard_seconds
+    bounds = [0.0, *cuts, None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _pump_audio(source, push_stream):
+    """Copies PCM from `source` into the recognizer's push stream, closing it at end of input"""
     try:
-        # -y: overwrite output, -vn: no video, -acodec pcm_s16le: WAV format
-        cmd = [
-            "ffmpeg", "-y", "-i", video_path, "-vn", "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1", audio_path
-        ]
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    except Exception as e:
-        logging.error(f"Failed to extract audio from {video_path} using ffmpeg: {e}")
+        while chunk := source.read(PIPE_CHUNK_SIZE):
+            push_stream.write(chunk)
+    finally:
+        push_stream.close()
+
+def transcribe_video_with_timestamps(video_path, speech_key, speech_endpoint, pool=None, duration=None,
+                                     granularity="both"):
+    """
+    Transcribes the audio of a video and returns (word_segments, sentence_segments).
+    Audio is piped from ffmpeg straight into the recognizer, without a temporary .wav file.
+    Videos known to be longer than SHARD_THRESHOLD_SECONDS are transcribed in shards, and clips
+    known to be shorter than SINGLE_SHOT_MAX_SECONDS without a continuous session.
+    With granularity "sentence", word_segments is empty and sentences use the display text.
+    """
+    pool = pool or get_recognizer_pool(speech_key, speech_endpoint, word_level=granularity != "sentence")
+    if duration and duration > SHARD_THRESHOLD_SECONDS:
+        return _transcribe_shards(video_path, pool, plan_shards(duration, detect_silences(video_path)))
+    if duration is not None and duration < SINGLE_SHOT_MAX_SECONDS:
+        return _transcribe_stream(video_path, pool, recognize=_recognize_single_shots)
+    return _transcribe_stream(video_path, pool)
+
+@_cached
+def get_whisper_model(model_size=WHISPER_MODEL_SIZE):
+    """
+    Loads a faster-whisper model once per process (int8, on the GPU when one is available).
+    Each of its workers serves one concurrent video and gets an equal share of the CPU threads,
+    so the videos running side by side do not oversubscribe the cores.
+    """
+    from faster_whisper import WhisperModel  # optional dependency, only needed for the whisper backend
+    workers = default_workers("whisper")
+    return WhisperModel(model_size, device="auto", compute_type="int8", num_workers=workers,
+                        cpu_threads=max(1, (os.cpu_count() or 1) // workers))
+
+def transcribe_local(video_path, granularity="both"):
+    """
+    Transcribes the audio of a video locally with faster-whisper and returns
+    (word_segments, sentence_segments) in the same form as the Azure path.
+    With granularity "sentence", word timestamps are not computed and word_segments is empty.
+    """
+    word_level = granularity != "sentence"
+    segments, _ = get_whisper_model().transcribe(video_path, word_timestamps=word_level)
+    word_results = []
+    sentence_results = []
+    for segment in segments:
+        sentence_results.append((segment.start, segment.end, segment.text.strip()))
+        if word_level:
+            word_results.extend((w.start, w.end, w.word.strip()) for w in segment.words)
+    return word_results, sentence_results
+
+def _transcribe_shards(video_path, pool, shards):
+    """
+    Transcribes each (start, end) shard of a video concurrently and returns the merged
+    (word_segments, sentence_segments), with timestamps relative to the start of the video.
+    """
+    def transcribe_shard(shard):
+        start, end = shard
+        shard_words, shard_sentences = _transcribe_stream(video_path, pool, start, end)
+        return (
+            [(s + start, e + start, text) for s, e, text in shard_words],
+            [(s + start, e + start, text) for s, e, text in shard_sentences],
+        )
+    # The recognizer pool caps concurrent sessions; this caps the ffmpeg decoders waiting on it
+    with ThreadPoolExecutor(max_workers=min(len(shards), MAX_SPEECH_SESSIONS)) as shard_pool:
+        results = list(shard_pool.map(transcribe_shard, shards))
+    word_segments = [segment for shard_words, _ in results for segment in shard_words]
+    sentence_segments = [segment for _, shard_sentences in results for segment in shard_sentences]
+    logging.info(f"Transcribed {video_path} in {len(shards)} shards")
+    return word_segments, sentence_segments
+
+def _transcribe_stream(video_path, pool, start=None, end=None, recognize=None):
+    """
+    Streams the audio of a video (optionally only [start, end) seconds) from ffmpeg into a
+    recognizer and returns (word_segments, sentence_segments) relative to `start`.
+    `recognize` drives the recognizer (default: continuous recognition).
+    """
+    recognize = recognize or _recognize_continuous
+    stream_format = speechsdk.audio.AudioStreamFormat(
+        samples_per_second=AUDIO_SAMPLE_RATE, bits_per_sample=AUDIO_BITS_PER_SAMPLE, channels=AUDIO_CHANNELS
+    )
+    push_stream = speechsdk.audio.PushAudioInputStream(stream_format)
+    proc = stream_audio_from_video(video_path, start, end)
+    pump = threading.Thread(target=_pump_audio, args=(proc.stdout, push_stream), daemon=True)
+    try:
+        with pool.acquire(speechsdk.AudioConfig(stream=push_stream)) as recognizer:
+            pump.start()
+            segments = recognize(recognizer, pool.word_level)
+    except BaseException:
+        proc.kill()
         raise
+    finally:
+        if pump.is_alive():
+            pump.join()
+        proc.stdout.close()
+        proc.wait()
+    if proc.returncode != 0:
+        logging.error(f"Failed to extract audio from {video_path} using ffmpeg (exit code {proc.returncode})")
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
+    return segments
+
+def _top_hypothesis(result_json):
+    """
+    Parses a recognition result's JSON once and returns (words, lexical) of its top confidence
+    NBest hypothesis, or ([], '') if it has none.
+    """
+    nbest_list = _json_loads(result_json).get('NBest')
+    if not nbest_list:
+        return [], ''
+    n = nbest_list[0]
+    return n.get('Words') or [], n.get('Lexical', '')
+
+def _append_result(result, word_level, word_results, sentence_results):
+    """
+    Appends the word and sentence segments of one recognized phrase.
+    Without word_level results (Simple output format) only the sentence segment is produced.
+    """
+    if result.reason != speechsdk.ResultReason.RecognizedSpeech:
+        return
+    if not word_level:
+        # Simple format: the phrase timing and display text come straight off the result
+        start_time = result.offset / 10000000.0
+        end_time = (result.offset + result.duration) / 10000000.0
+        sentence_results.append((start_time, end_time, result.text))
+        return
+    words, lexical = _top_hypothesis(result.json)
+    if words:  # Ensure there are words to derive word and sentence times
+        # The service always sets Offset/Duration/Word (100-nanosecond units), so index them directly
+        word_results.extend([
+            (w['Offset'] / 10000000.0, (w['Offset'] + w['Duration']) / 10000000.0, w['Word'])
+            for w in words
+        ])
+        # The whole recognized phrase becomes one sentence segment
+        start_time = words[0]['Offset'] / 10000000.0
+        end_time = (words[-1]['Offset'] + words[-1]['Duration']) / 10000000.0
+        sentence_results.append((start_time, end_time, lexical))
 
-def transcribe_audio_with_word_timestamps(audio_path, speech_key, speech_endpoint):
+def _recognize_continuous(recognizer, word_level=True):
+    """
+    Runs continuous recognition to completion and returns (word_segments, sentence_segments).
+    Raises RuntimeError if the session is canceled with an error (bad key, quota, network), so a
+    failed session is never mistaken for silence.
     """
-    Transcribes audio and returns a list of (start_time, end_time, text) tuples for each word
-    from the top confidence STT result.
+    # The SDK's callback thread only collects results; parsing happens here once recognition ends,
+    # so a slow parse never holds up the SDK while it is still streaming audio
+    results = []
+    errors = []
+    done = threading.Event()
+    def on_canceled(evt):
+        if evt.cancellation_details.reason == speechsdk.CancellationReason.Error:
+            errors.append(evt.cancellation_details.error_details)
+        done.set()
+    recognizer.recognized.connect(lambda evt: results.append(evt.result))
+    recognizer.session_stopped.connect(lambda evt: done.set())
+    recognizer.canceled.connect(on_canceled)
+    recognizer.start_continuous_recognition()
+    done.wait()
+    recognizer.stop_continuous_recognition()
+    if errors:
+        raise RuntimeError(f"Speech recognition canceled: {errors[0]}")
+    word_results = []
+    sentence_results = []
+    for result in results:
+        _append_result(result, word_level, word_results, sentence_results)
+    return word_results, sentence_results
+
+def _recognize_single_shots(recognizer, word_level=True):
     """
+    Recognizes a short clip one utterance at a time with recognize_once, which avoids setting up
+    and tearing down a continuous session, and returns (word_segments, sentence_segments).
+    Stops when the audio ends; any other cancellation raises RuntimeError.
+    """
+    word_results = []
+    sentence_results = []
+    while True:
+        result = recognizer.recognize_once_async().get()
+        if result.reason == speechsdk.ResultReason.Canceled:
+            details = result.cancellation_details
+            if details.reason == speechsdk.CancellationReason.EndOfStream:
+                break
+            raise RuntimeError(f"Speech recognition canceled: {details.error_details}")
+        # NoMatch (e.g. a stretch of music) just moves on to the next utterance
+        _append_result(result, word_level, word_results, sentence_results)
+    return word_results, sentence_results
+
+def write_segments(path, segments):
+    """Writes (start_time, end_time, text) segments as "[start - end] text" UTF-8 lines in a single write"""
+    data = "".join([f"[{start:.2f} - {end:.2f}] {text}\n" for start, end, text in segments]).encode("utf-8")
+    # Binary mode: the text is encoded once, and a write this size bypasses the buffer
+    with open(path, "wb") as f:
+        f.write(data)
+
+def _fingerprint(path):
+    """Cheap content fingerprint of a file: size, mtime and a hash of its first MiB"""
+    st = os.stat(path)
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        h.update(f.read(FINGERPRINT_BYTES))
+    return f"{st.st_size}:{st.st_mtime_ns}:{h.hexdigest()}"
+
+def _load_cache(cache_path):
+    """Reads the transcription cache, starting empty if it is missing or unreadable"""
     try:
-        speech_config = speechsdk.SpeechConfig(subscription=speech_key, endpoint=speech_endpoint)
-        audio_input = speechsdk.AudioConfig(filename=audio_path)
-        speech_config.output_format = speechsdk.OutputFormat.Detailed
-        recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config, audio_config=audio_input)
-        results = []
-        done = False
-        def handle_final(evt):
-            if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech:
-                import json as _json
-                j = _json.loads(evt.result.json)
-                nbest_list = j.get('NBest', [])
-                if nbest_list:  # Check if NBest list is not empty
-                    n = nbest_list[0]  # Process only the top confidence NBest hypothesis
-                    if 'Words' in n: # Check if the top hypothesis has words
-                        for w in n.get('Words', []): # Iterate through words of the top hypothesis
-                            start_time = w.get('Offset') / 10000000.0  # 100-nanosecond units to seconds
-                            duration = w.get('Duration') / 10000000.0
-                            end_time = start_time + duration
-                            text = w.get('Word')
-                            results.append((start_time, end_time, text))
-        recognizer.recognized.connect(handle_final)
-        recognizer.session_stopped.connect(lambda evt: setattr(recognizer, 'done', True))
-        recognizer.canceled.connect(lambda evt: setattr(recognizer, 'done', True))
-        recognizer.start_continuous_recognition()
-        import time
-        while not getattr(recognizer, 'done', False):
-            time.sleep(0.5)
-        recognizer.stop_continuous_recognition()
-        return results
-    except Exception as e:
-        logging.error(f"Error during transcription with word timestamps: {e}")
-        return []
+        with open(cache_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _save_cache(cache_path, cache):
+    """Writes the transcription cache; a failed write only logs, the transcriptions are already saved"""
+    try:
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+    except OSError as e:
+        logging.warning(f"Could not save transcription cache {cache_path}: {e}")
+
+def _is_up_to_date(entry, fingerprint, output_paths):
+    """Whether every requested transcription file is still the one produced from this fingerprint"""
+    try:
+        return entry["fingerprint"] == fingerprint and all(
+            os.stat(path).st_mtime_ns == entry[f"{level}_txt_mtime"] for level, path in output_paths.items()
+        )
+    except (KeyError, OSError):
+        return False
+
+def _format_duration(duration):
+    """Human-readable duration for log lines"""
+    return "unknown duration" if duration is None else f"{duration:.1f}s"
 
-def transcribe_audio_with_sentence_timestamps(audio_path, speech_key, speech_endpoint):
+def _process_video(video_path, cache_entry=None, granularity="both", backend="azure"):
     """
-    Transcribes audio and returns a list of (start_time, end_time, text) tuples for each recognized sentence
-    from the top confidence STT result.
+    Transcribes one video with `backend` ("azure" or "whisper") and saves its word and/or sentence
+    timestamps (per `granularity`), unless `cache_entry` shows the saved files are up to date.
+    Returns the video's cache entry, or None if it failed.
     """
+    base = os.path.splitext(video_path)[0]
+    output_paths = {level: base + OUTPUT_SUFFIXES[level] for level in GRANULARITIES[granularity]}
+    
     try:
-        import json as _json # Ensure json is imported here as well
-        speech_config = speechsdk.SpeechConfig(subscription=speech_key, endpoint=speech_endpoint)
-        audio_input = speechsdk.AudioConfig(filename=audio_path)
-        speech_config.output_format = speechsdk.OutputFormat.Detailed
-        recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config, audio_config=audio_input)
-        results = []
-        done = False
-        def handle_final(evt):
-            if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech:
-                j = _json.loads(evt.result.json)
-                nbest_list = j.get('NBest', [])
-                if nbest_list:  # Check if NBest list is not empty
-                    n = nbest_list[0]  # Process only the top confidence result
-                    if 'Words' in n and n['Words']: # Ensure there are words to derive sentence times
-                        words = n['Words']
-                        start_time = words[0]['Offset'] / 10000000.0
-                        end_time = (words[-1]['Offset'] + words[-1]['Duration']) / 10000000.0
-                        sentence_text = n.get('Lexical', '') # Get sentence text
-                        results.append((start_time, end_time, sentence_text))
-        recognizer.recognized.connect(handle_final)
-        recognizer.session_stopped.connect(lambda evt: setattr(recognizer, 'done', True))
-        recognizer.canceled.connect(lambda evt: setattr(recognizer, 'done', True))
-        recognizer.start_continuous_recognition()
-        import time
-        while not getattr(recognizer, 'done', False):
-            time.sleep(0.5)
-        recognizer.stop_continuous_recognition()
-        return results
+        # Outputs from another backend or granularity differ in content, so they never count as up to date
+        fingerprint = f"{_fingerprint(video_path)}:{backend}:{granularity}"
+        if cache_entry and _is_up_to_date(cache_entry, fingerprint, output_paths):
+            logging.info(f"Skipping {video_path}: transcription is up to date")
+            return cache_entry
+        
+        duration = probe_duration(video_path)
+        logging.info(f"Processing {video_path} ({_format_duration(duration)}) ...")
+        # Word- and sentence-level timestamps come from the same recognition pass
+        if backend == "whisper":
+            word_segments, sentence_segments = transcribe_local(video_path, granularity)
+        else:
+            word_segments, sentence_segments = transcribe_video_with_timestamps(
+                video_path, SPEECH_KEY, SPEECH_ENDPOINT, duration=duration, granularity=granularity
+            )
+        segments = {"word": word_segments, "sentence": sentence_segments}
+        
+        # Save the requested word- and/or sentence-level timestamps
+        for level, path in output_paths.items():
+            write_segments(path, segments[level])
+            logging.info(f"{level.capitalize()}-level transcription saved to {path}")
+        
+        return {
+            "fingerprint": fingerprint,
+            **{f"{level}_txt_mtime": os.stat(path).st_mtime_ns for level, path in output_paths.items()},
+        }
     except Exception as e:
-        logging.error(f"Error during transcription with sentence timestamps: {e}")
+        logging.error(f"Failed to process {video_path}: {e}")
+        return None
+
+def default_workers(backend="azure"):
+    """
+    Default number of videos transcribed concurrently. Azure videos spend their time waiting on
+    the network, so they fill every allowed speech session whatever the CPU count; local whisper
+    is CPU-bound and gets one video per core.
+    """
+    if backend == "whisper":
+        return os.cpu_count() or 1
+    return MAX_SPEECH_SESSIONS
+
+def _find_videos(input_dir):
+    """Paths of the .mp4 files directly inside `input_dir` (none if the directory is missing)"""
+    try:
+        with os.scandir(input_dir) as entries:
+            return [entry.path for entry in entries if entry.name.endswith(".mp4") and entry.is_file()]
+    except FileNotFoundError:
         return []
 
-def main():
-    input_dir = "inputs"
-    video_files = glob.glob(os.path.join(input_dir, "*.mp4"))
+def main(videos=None, workers=None, force=False, input_dir="inputs", granularity="both", backend="azure"):
+    """
+    Transcribes each video in `videos` (default: every .mp4 in `input_dir`) at the given
+    `granularity` ("word", "sentence" or "both") with `backend` ("azure" or "whisper"),
+    processing up to `workers` videos concurrently.
+    Videos whose transcription files are up to date according to the cache in their own
+    directory are skipped unless `force` is set.
+    """
+    video_files = videos if videos is not None else _find_videos(input_dir)
     if not video_files:
-        logging.info("No video files found in 'inputs' directory.")
+        logging.info(f"No video files found in '{input_dir}' directory.")
         return
-    for video_path in video_files:
-        base = os.path.splitext(video_path)[0]
-        word_txt_path = base + "_word.txt"
-        sentence_txt_path = base + "_sentence.txt"
-        audio_path = base + ".wav" # Keep .wav for temporary audio
-        
-        logging.info(f"Processing {video_path} ...")
+    # The cache lives next to the videos, which need not be in `input_dir` when given explicitly
+    cache_path_of = {
+        video_path: os.path.join(os.path.dirname(video_path), CACHE_FILENAME) for video_path in video_files
+    }
+    caches = {cache_path: _load_cache(cache_path) for cache_path in set(cache_path_of.values())}
+    cache_of = {video_path: caches[cache_path] for video_path, cache_path in cache_path_of.items()}
+    # Each video is dominated by the ffmpeg subprocess and the Azure session, so threads suffice;
+    # a thread waiting on its recognizer holds no CPU, so one per speech session is cheap
+    with ThreadPoolExecutor(max_workers=workers or default_workers(backend)) as pool:
+        entries = list(pool.map(
+            lambda video_path: _process_video(
+                video_path, None if force else cache_of[video_path].get(video_path), granularity, backend
+            ),
+            video_files
+        ))
+    for video_path, entry in zip(video_files, entries):
+        if entry:
+            cache_of[video_path][video_path] = entry
+    for cache_path, cache in caches.items():
+        _save_cache(cache_path, cache)
+
+def prewarm(backend="azure", granularity="both"):
+    """
+    Starts warming up, on background threads, the tools the first video would otherwise wait for:
+    the ffmpeg binary and the Azure connection (or the local whisper model). Failures only log.
+    """
+    def run(name, warm):
         try:
-            extract_audio_from_video(video_path, audio_path)
-            
-            # Get and save word-level timestamps
-            word_segments = transcribe_audio_with_word_timestamps(audio_path, SPEECH_KEY, SPEECH_ENDPOINT)
-            with open(word_txt_path, "w", encoding="utf-8") as f:
-                for start, end, word in word_segments:
-                    f.write(f"[{start:.2f} - {end:.2f}] {word}\n")
-            logging.info(f"Word-level transcription saved to {word_txt_path}")
-
-            # Get and save sentence-level timestamps
-            sentence_segments = transcribe_audio_with_sentence_timestamps(audio_path, SPEECH_KEY, SPEECH_ENDPOINT)
-            with open(sentence_txt_path, "w", encoding="utf-8") as f:
-                for start, end, sentence in sentence_segments:
-                    f.write(f"[{start:.2f} - {end:.2f}] {sentence}\n")
-            logging.info(f"Sentence-level transcription saved to {sentence_txt_path}")
-            
+            warm()
         except Exception as e:
-            logging.error(f"Failed to process {video_path}: {e}")
-        finally:
-            # Clean up the temporary wav file
-            if os.path.exists(audio_path):
-                try:
-                    os.remove(audio_path)
-                    logging.info(f"Temporary audio file {audio_path} removed.")
-                except Exception as e:
-                    logging.warning(f"Could not remove temporary audio file {audio_path}: {e}")
+            logging.debug(f"Pre-warming {name} failed: {e}")
+    def warm_ffmpeg():
+        subprocess.run(["ffmpeg", "-version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    def warm_azure():
+        get_recognizer_pool(SPEECH_KEY, SPEECH_ENDPOINT, word_level=granularity != "sentence").prewarm()
+    tasks = [("ffmpeg", warm_ffmpeg)]
+    if backend == "whisper":
+        tasks.append(("whisper model", get_whisper_model))
+    else:
+        tasks.append(("Azure Speech connection", warm_azure))
+    for name, warm in tasks:
+        threading.Thread(target=run, args=(name, warm), daemon=True).start()
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Transcribe the videos in the inputs directory')
+    parser.add_argument('--workers', type=int,
+                        help='Number of videos to transcribe concurrently '
+                             f'(default: {MAX_SPEECH_SESSIONS} for azure, the CPU count for whisper)')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-transcribe videos even if their transcription files are up to date')
+    parser.add_argument('--granularity', choices=sorted(GRANULARITIES), default='both',
+                        help='Which transcription files to produce; "sentence" uses the lighter Simple output format')
+    parser.add_argument('--backend', choices=['azure', 'whisper'], default='azure',
+                        help='Azure Speech-to-Text, or local faster-whisper (requires the faster-whisper package)')
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.backend == "azure":
+        SPEECH_KEY, SPEECH_ENDPOINT = _validate_env()
+    prewarm(args.backend, args.granularity)
+    main(workers=args.workers, force=args.force, granularity=args.granularity, backend=args.backend)